@@ -44,6 +44,9 @@ class TestSearchIntegration(unittest.TestCase):
     def test_bm25_rm3(self):
         self.assertTrue(self.checker.run('core17_bm25_rm3', '-bm25 -rm3', '--bm25 --rm3'))
 
+    def test_bm25_batch(self):
+        self.assertTrue(self.checker.run('core17_bm25_batch', '-bm25', '--bm25 --threads 4 --batch-size 64'))
+
     def test_qld(self):
         self.assertTrue(self.checker.run('core17_qld', '-qld', '--qld'))
 
@@ -14,6 +14,7 @@
 # limitations under the License.
 #
 
+import threading
 from typing import List
 
 from ..pyclass import autoclass, JString
@@ -35,9 +36,14 @@ JAnalyzerUtils = autoclass('io.anserini.analysis.AnalyzerUtils')
 JFreebaseAnalyzer = autoclass('io.anserini.analysis.FreebaseAnalyzer')
 JTweetAnalyzer = autoclass('io.anserini.analysis.TweetAnalyzer')
 
+# Analyzers created by get_lucene_analyzer, keyed by their settings.
+_analyzers = {}
+_analyzers_lock = threading.Lock()
+
 
 def get_lucene_analyzer(name='english', stemming=True, stemmer='porter', stopwords=True) -> JAnalyzer:
-    """Create a Lucene ``Analyzer`` with specific settings.
+    """Create a Lucene ``Analyzer`` with specific settings, or return the one created earlier with the same settings.
+    Lucene analyzers are safe to use from multiple threads, so they are shared, and must not be closed.
 
     Parameters
     ----------
@@ -55,25 +61,33 @@ def get_lucene_analyzer(name='english', stemming=True, stemmer='porter', stopwor
     JAnalyzer
         Java ``Analyzer`` with specified settings.
     """
-    if name.lower() == 'arabic':
+    key = (name.lower(), stemming, stemmer, stopwords)
+    with _analyzers_lock:
+        if key not in _analyzers:
+            _analyzers[key] = _create_lucene_analyzer(*key)
+        return _analyzers[key]
+
+
+def _create_lucene_analyzer(name, stemming, stemmer, stopwords) -> JAnalyzer:
+    if name == 'arabic':
         return JArabicAnalyzer()
-    elif name.lower() == 'bengali':
+    elif name == 'bengali':
         return JBengaliAnalyzer()
-    elif name.lower() == 'cjk':
+    elif name == 'cjk':
         return JCJKAnalyzer()
-    elif name.lower() == 'german':
+    elif name == 'german':
         return JGermanAnalyzer()
-    elif name.lower() == 'spanish':
+    elif name == 'spanish':
         return JSpanishAnalyzer()
-    elif name.lower() == 'french':
+    elif name == 'french':
         return JFrenchAnalyzer()
-    elif name.lower() == 'hindi':
+    elif name == 'hindi':
         return JHindiAnalyzer()
-    elif name.lower() == 'freebase':
+    elif name == 'freebase':
         return JFreebaseAnalyzer()
-    elif name.lower() == 'tweet':
+    elif name == 'tweet':
         return JTweetAnalyzer()
-    elif name.lower() == 'english':
+    elif name == 'english':
         if stemming:
             if stopwords:
                 return JDefaultEnglishAnalyzer.newStemmingInstance(JString(stemmer))
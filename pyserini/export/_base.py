@@ -0,0 +1,601 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+This module provides readers and writers for data exported from Lucene indexes as (memory-mapped) NumPy arrays. Unlike
+the rest of Pyserini, nothing here depends on the JVM, so exported data can be used from lightweight Python processes.
+The exporters themselves live on ``pyserini.index.IndexReader``.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+def _encode_strings(encoded: List[bytes]):
+    # Variable-length strings are stored as one flat UTF-8 byte array plus offsets, which can be memory-mapped.
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+@contextmanager
+def _atomic_directory(path: str, metadata: Optional[Dict] = None):
+    # Yield a temporary directory that is renamed into place on success, so readers never see a partial export. Each
+    # call gets a directory of its own beside the export, so concurrent writers, also in other processes, never collide.
+    parent, name = os.path.split(os.path.normpath(path))
+    os.makedirs(parent or '.', exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=f'.{name}.', suffix='.tmp', dir=parent or '.')
+    try:
+        yield tmp_path
+        with open(os.path.join(tmp_path, 'export.json'), 'w') as f:
+            json.dump(metadata or {}, f)
+        _replace_directory(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def _replace_directory(src: str, dst: str):
+    # A directory cannot be renamed over a non-empty one, so an existing export is first renamed aside under a unique
+    # name and removed afterwards. If another writer renames its export into place in between, try again: the last
+    # writer wins, and every export that is in place is complete.
+    parent, name = os.path.split(os.path.normpath(dst))
+    while True:
+        old_path = os.path.join(parent, f'.{name}.{uuid.uuid4().hex}.old')
+        try:
+            os.rename(dst, old_path)
+        except FileNotFoundError:
+            old_path = None
+        try:
+            os.rename(src, dst)
+            break
+        except OSError:
+            if not os.path.isdir(dst):
+                raise
+        finally:
+            if old_path is not None:
+                shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _save_arrays(path: str, arrays: Dict[str, np.ndarray]):
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array)
+
+
+def _write_arrays(path: str, arrays: Dict[str, np.ndarray], metadata: Optional[Dict] = None):
+    with _atomic_directory(path, metadata) as tmp_path:
+        _save_arrays(tmp_path, arrays)
+
+
+def _load_metadata(path: str) -> Dict:
+    # Metadata stored with an export by _atomic_directory; exports written before metadata was stored have none.
+    metadata_path = os.path.join(path, 'export.json')
+    if not os.path.exists(metadata_path):
+        return {}
+    with open(metadata_path) as f:
+        return json.load(f)
+
+
+def _load_arrays(path: str, names: Sequence[str], mmap: bool):
+    mmap_mode = 'r' if mmap else None
+    return [np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode) for name in names]
+
+
+def _hash(encoded: bytes) -> int:
+    # Python's hash() is salted per process, so exported hash tables use a stable 64-bit hash instead.
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=8).digest(), 'little')
+
+
+class TermDictionary:
+    """Term dictionary of an index, i.e., its (analyzed) terms in index order with their document frequencies and
+    collection frequencies, stored as NumPy arrays in a directory and loaded memory-mapped.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the exported term dictionary.
+    mmap : bool
+        Memory-map the arrays instead of reading them into memory.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.term_bytes, self.term_offsets, self.df, self.cf = \
+            _load_arrays(path, ['terms.bytes', 'terms.offsets', 'df', 'cf'], mmap)
+
+    @staticmethod
+    def write(path: str, terms: List[str], df: np.ndarray, cf: np.ndarray):
+        """Write a term dictionary to a directory.
+
+        Parameters
+        ----------
+        path : str
+            Directory to write to; replaced if it exists.
+        terms : List[str]
+            Terms, in index order.
+        df : np.ndarray
+            Document frequency of each term.
+        cf : np.ndarray
+            Collection frequency of each term.
+        """
+        term_bytes, term_offsets = _encode_strings([term.encode('utf-8') for term in terms])
+        _write_arrays(path, {'terms.bytes': term_bytes, 'terms.offsets': term_offsets,
+                             'df': np.asarray(df, dtype=np.int64), 'cf': np.asarray(cf, dtype=np.int64)})
+
+    def __len__(self):
+        return len(self.df)
+
+    def _term_bytes(self, i: int) -> bytes:
+        return bytes(self.term_bytes[self.term_offsets[i]:self.term_offsets[i + 1]])
+
+    def term(self, i: int) -> str:
+        """Return the ``i``-th term."""
+        return self._term_bytes(i).decode('utf-8')
+
+    def get_term_id(self, term: str) -> int:
+        """Return the position of an (analyzed) term in the dictionary, or -1 if it does not exist. Lucene orders
+        terms by their UTF-8 bytes, so this is a binary search.
+
+        Parameters
+        ----------
+        term : str
+            Analyzed term.
+
+        Returns
+        -------
+        int
+            Term id, or -1 if the term does not exist.
+        """
+        encoded = term.encode('utf-8')
+        low, high = 0, len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self._term_bytes(mid) < encoded:
+                low = mid + 1
+            else:
+                high = mid
+        return low if low < len(self) and self._term_bytes(low) == encoded else -1
+
+    def terms(self) -> np.ndarray:
+        """Return all terms as an array of ``str`` objects."""
+        data = bytes(self.term_bytes)
+        offsets = self.term_offsets.tolist()
+        return np.array([data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(self))], dtype=object)
+
+
+class TermStatistics:
+    """Snapshot of the term statistics of an index, i.e., the document and collection frequency of every (analyzed)
+    term together with the index statistics of :func:`pyserini.index.IndexReader.stats`, stored in a directory and
+    loaded memory-mapped. Terms are kept in index order, which is sorted, so lookups are binary searches and opening a
+    snapshot costs nothing regardless of the vocabulary size.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the exported term statistics.
+    mmap : bool
+        Memory-map the arrays instead of reading them into memory.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.terms = TermDictionary(os.path.join(path, 'terms'), mmap=mmap)
+        with open(os.path.join(path, 'stats.json')) as f:
+            self._stats = json.load(f)
+        self.metadata = _load_metadata(path)
+
+    @staticmethod
+    def write(path: str, terms: List[str], df: np.ndarray, cf: np.ndarray, stats: Dict[str, int],
+              metadata: Optional[Dict] = None):
+        """Write term statistics to a directory.
+
+        Parameters
+        ----------
+        path : str
+            Directory to write to; replaced if it exists.
+        terms : List[str]
+            Terms, in index order.
+        df : np.ndarray
+            Document frequency of each term.
+        cf : np.ndarray
+            Collection frequency of each term.
+        stats : Dict[str, int]
+            Index statistics.
+        metadata : Optional[Dict]
+            Metadata to store with the export, e.g., the state of the index it was exported from.
+        """
+        with _atomic_directory(path, metadata) as tmp_path:
+            TermDictionary.write(os.path.join(tmp_path, 'terms'), terms, df, cf)
+            with open(os.path.join(tmp_path, 'stats.json'), 'w') as f:
+                json.dump({name: int(value) for name, value in stats.items()}, f)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def get_term_counts(self, term: str) -> Tuple[int, int]:
+        """Return the document frequency and collection frequency of an (analyzed) term, as
+        :func:`pyserini.index.IndexReader.get_term_counts` does; both are 0 if the term does not exist. No analysis is
+        applied, so terms must be analyzed the same way as the index, e.g., with ``IndexReader.analyze`` up front.
+
+        Parameters
+        ----------
+        term : str
+            Analyzed term.
+
+        Returns
+        -------
+        Tuple[int, int]
+            Document frequency and collection frequency.
+        """
+        term_id = self.terms.get_term_id(term)
+        if term_id < 0:
+            return 0, 0
+        return int(self.terms.df[term_id]), int(self.terms.cf[term_id])
+
+    def batch_get_term_counts(self, terms: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the document frequencies and collection frequencies of multiple (analyzed) terms as ``int64``
+        arrays, with 0 for terms that do not exist.
+
+        Parameters
+        ----------
+        terms : Sequence[str]
+            Analyzed terms.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Document frequencies and collection frequencies, aligned with ``terms``.
+        """
+        term_ids = np.array([self.terms.get_term_id(term) for term in terms], dtype=np.int64)
+        found = term_ids >= 0
+        df = np.zeros(len(term_ids), dtype=np.int64)
+        cf = np.zeros(len(term_ids), dtype=np.int64)
+        df[found] = self.terms.df[term_ids[found]]
+        cf[found] = self.terms.cf[term_ids[found]]
+        return df, cf
+
+    def stats(self) -> Dict[str, int]:
+        """Return the index statistics, as :func:`pyserini.index.IndexReader.stats` does.
+
+        Returns
+        -------
+        Dict[str, int]
+            Index statistics as a dictionary of statistic's name to statistic.
+        """
+        return dict(self._stats)
+
+
+class DocidMap:
+    """Mapping between Lucene internal ``docid``s and external collection ``docid``s, stored as NumPy arrays in a
+    directory and loaded memory-mapped. Internal ``docid``s index directly into the collection ``docid``s, and
+    collection ``docid``s are looked up in an open-addressing hash table, so both directions take constant time.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the exported mapping.
+    mmap : bool
+        Memory-map the arrays instead of reading them into memory.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.docid_bytes, self.docid_offsets, self.hashes, self.table = \
+            _load_arrays(path, ['docids.bytes', 'docids.offsets', 'hashes', 'table'], mmap)
+        self._mask = len(self.table) - 1
+        self.metadata = _load_metadata(path)
+
+    @staticmethod
+    def write(path: str, docids: List[Optional[str]], metadata: Optional[Dict] = None):
+        """Write a docid mapping to a directory.
+
+        Parameters
+        ----------
+        path : str
+            Directory to write to; replaced if it exists.
+        docids : List[Optional[str]]
+            Collection ``docid`` of each Lucene internal ``docid``, in order; ``None`` for deleted documents.
+        metadata : Optional[Dict]
+            Metadata to store with the export, e.g., the state of the index it was exported from.
+        """
+        encoded = [(docid or '').encode('utf-8') for docid in docids]
+        docid_bytes, docid_offsets = _encode_strings(encoded)
+        hashes = np.fromiter((_hash(b) for b in encoded), dtype=np.uint64, count=len(encoded))
+
+        # Linear probing with a load factor of at most 1/2. Insertion is vectorized: in each round, every pending
+        # docid probes its next slot, and the first docid to claim each empty slot takes it.
+        table_size = 1 << max(int(2 * len(docids) - 1).bit_length(), 1)
+        table = np.full(table_size, -1, dtype=np.int32)
+        # Deleted documents have no collection docid, so they are left out of the table.
+        pending = np.flatnonzero(np.diff(docid_offsets) > 0)
+        probe = 0
+        while len(pending) > 0:
+            slots = ((hashes[pending] + np.uint64(probe)) & np.uint64(table_size - 1)).astype(np.int64)
+            empty = table[slots] == -1
+            _, first = np.unique(slots[empty], return_index=True)
+            placed = np.flatnonzero(empty)[first]
+            table[slots[placed]] = pending[placed]
+            pending = np.delete(pending, placed)
+            probe += 1
+
+        _write_arrays(path, {'docids.bytes': docid_bytes, 'docids.offsets': docid_offsets, 'hashes': hashes,
+                             'table': table}, metadata)
+
+    def __len__(self):
+        return len(self.docid_offsets) - 1
+
+    def _docid_bytes(self, docid: int) -> bytes:
+        return bytes(self.docid_bytes[self.docid_offsets[docid]:self.docid_offsets[docid + 1]])
+
+    def convert_internal_docid_to_collection_docid(self, docid: int) -> Optional[str]:
+        """Convert Lucene's internal ``docid`` to its external collection ``docid``.
+
+        Parameters
+        ----------
+        docid : int
+            Lucene internal ``docid``.
+
+        Returns
+        -------
+        Optional[str]
+            External collection ``docid`` corresponding to Lucene's internal ``docid``, or ``None`` if the document
+            was deleted.
+        """
+        return self._docid_bytes(docid).decode('utf-8') or None
+
+    def convert_collection_docid_to_internal_docid(self, docid: str) -> int:
+        """Convert external collection ``docid`` to its Lucene's internal ``docid``.
+
+        Parameters
+        ----------
+        docid : str
+            External collection ``docid``.
+
+        Returns
+        -------
+        int
+            Lucene internal ``docid`` corresponding to the external collection ``docid``, or -1 if it does not exist.
+        """
+        encoded = docid.encode('utf-8')
+        h = _hash(encoded)
+        slot = h & self._mask
+        while True:
+            internal_docid = int(self.table[slot])
+            if internal_docid == -1:
+                return -1
+            if self.hashes[internal_docid] == h and self._docid_bytes(internal_docid) == encoded:
+                return internal_docid
+            slot = (slot + 1) & self._mask
+
+    def convert_internal_docids_to_collection_docids(self, docids: Sequence[int]) -> np.ndarray:
+        """Convert an array of Lucene internal ``docid``s to external collection ``docid``s.
+
+        Parameters
+        ----------
+        docids : Sequence[int]
+            Lucene internal ``docid``s.
+
+        Returns
+        -------
+        np.ndarray
+            External collection ``docid``s, as ``str`` objects; ``None`` for deleted documents.
+        """
+        docids = np.asarray(docids, dtype=np.int64)
+        starts = self.docid_offsets[docids].tolist()
+        ends = self.docid_offsets[docids + 1].tolist()
+        return np.array([bytes(self.docid_bytes[start:end]).decode('utf-8') or None
+                         for start, end in zip(starts, ends)], dtype=object)
+
+    def convert_collection_docids_to_internal_docids(self, docids: Sequence[str]) -> np.ndarray:
+        """Convert a sequence of external collection ``docid``s to Lucene internal ``docid``s. Probing is vectorized
+        across all ``docid``s.
+
+        Parameters
+        ----------
+        docids : Sequence[str]
+            External collection ``docid``s.
+
+        Returns
+        -------
+        np.ndarray
+            Lucene internal ``docid``s as ``int32``, -1 for ``docid``s that do not exist.
+        """
+        encoded = [docid.encode('utf-8') for docid in docids]
+        hashes = np.fromiter((_hash(b) for b in encoded), dtype=np.uint64, count=len(encoded))
+        results = np.full(len(encoded), -1, dtype=np.int32)
+
+        pending = np.arange(len(encoded), dtype=np.int64)
+        probe = 0
+        while len(pending) > 0:
+            slots = ((hashes[pending] + np.uint64(probe)) & np.uint64(self._mask)).astype(np.int64)
+            candidates = np.asarray(self.table[slots])
+            occupied = candidates != -1
+            matched = np.zeros(len(pending), dtype=bool)
+            hash_matched = np.flatnonzero(occupied)
+            hash_matched = hash_matched[self.hashes[candidates[hash_matched]] == hashes[pending[hash_matched]]]
+            for i in hash_matched:
+                if self._docid_bytes(int(candidates[i])) == encoded[pending[i]]:
+                    matched[i] = True
+            results[pending[matched]] = candidates[matched]
+            # Stop probing docids that were found or that reached an empty slot.
+            pending = pending[occupied & ~matched]
+            probe += 1
+
+        return results
+
+
+class DocumentLengths:
+    """Per-document length statistics of an index, as ``int32`` arrays indexed by Lucene internal ``docid``, stored in
+    a directory and loaded memory-mapped.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the exported document lengths.
+    mmap : bool
+        Memory-map the arrays instead of reading them into memory.
+
+    Attributes
+    ----------
+    lengths : np.ndarray
+        Number of (analyzed) terms in each document, from its document vector.
+    unique_terms : np.ndarray
+        Number of unique (analyzed) terms in each document, from its document vector.
+    norm_lengths : np.ndarray
+        Document lengths as encoded in the index norms, which Lucene stores lossily in one byte; these are the lengths
+        that Lucene's similarities, e.g., BM25, score with.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.lengths, self.unique_terms, self.norm_lengths = \
+            _load_arrays(path, ['lengths', 'unique_terms', 'norm_lengths'], mmap)
+        self.metadata = _load_metadata(path)
+
+    @staticmethod
+    def write(path: str, lengths: np.ndarray, unique_terms: np.ndarray, norm_lengths: np.ndarray,
+              metadata: Optional[Dict] = None):
+        """Write document lengths to a directory.
+
+        Parameters
+        ----------
+        path : str
+            Directory to write to; replaced if it exists.
+        lengths : np.ndarray
+            Number of terms in each document.
+        unique_terms : np.ndarray
+            Number of unique terms in each document.
+        norm_lengths : np.ndarray
+            Document lengths as encoded in the index norms.
+        metadata : Optional[Dict]
+            Metadata to store with the export, e.g., the state of the index it was exported from.
+        """
+        _write_arrays(path, {'lengths': np.asarray(lengths, dtype=np.int32),
+                             'unique_terms': np.asarray(unique_terms, dtype=np.int32),
+                             'norm_lengths': np.asarray(norm_lengths, dtype=np.int32)}, metadata)
+
+    def __len__(self):
+        return len(self.lengths)
+
+
+class DocumentTermMatrix:
+    """Document-term matrix of a whole index, with one row per Lucene internal ``docid``, one column per term of the
+    index's term dictionary, and term frequencies as values, stored as CSR arrays in a directory. The arrays are
+    memory-mapped, so :attr:`matrix` is available immediately and rows are only read from disk when accessed.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the exported matrix.
+    mmap : bool
+        Memory-map the arrays instead of reading them into memory.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        with open(os.path.join(path, 'matrix.json')) as f:
+            self.shape = tuple(json.load(f)['shape'])
+        indptr, indices, data = _load_arrays(path, ['indptr', 'indices', 'data'], mmap)
+        self.matrix = csr_matrix((data, indices, indptr), shape=self.shape, copy=False)
+        self.terms = TermDictionary(os.path.join(path, 'terms'), mmap=mmap)
+        self.metadata = _load_metadata(path)
+
+    @staticmethod
+    def write_shard(path: str, shard: int, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray):
+        """Write one shard, i.e., the CSR arrays of a contiguous range of rows, to a working directory.
+
+        Parameters
+        ----------
+        path : str
+            Working directory holding the shards.
+        shard : int
+            Shard number; shards are concatenated in this order.
+        indptr : np.ndarray
+            Row pointers of the shard, starting at 0.
+        indices : np.ndarray
+            Column ids.
+        data : np.ndarray
+            Term frequencies.
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, f'shard-{shard:05d}.indptr.npy'), np.asarray(indptr, dtype=np.int64))
+        np.save(os.path.join(path, f'shard-{shard:05d}.indices.npy'), np.asarray(indices, dtype=np.int32))
+        np.save(os.path.join(path, f'shard-{shard:05d}.data.npy'), np.asarray(data, dtype=np.int32))
+
+    @staticmethod
+    def merge_shards(shard_path: str, path: str, num_shards: int, terms: List[str], df: np.ndarray,
+                     cf: np.ndarray, metadata: Optional[Dict] = None):
+        """Concatenate the shards in a working directory into the final matrix, one shard at a time so that memory
+        stays bounded by the size of a shard, and move it into place.
+
+        Parameters
+        ----------
+        shard_path : str
+            Working directory holding the shards; removed afterwards.
+        path : str
+            Directory to write the matrix to; replaced if it exists.
+        num_shards : int
+            Number of shards.
+        terms : List[str]
+            Terms of the columns, in order.
+        df : np.ndarray
+            Document frequency of each term.
+        cf : np.ndarray
+            Collection frequency of each term.
+        metadata : Optional[Dict]
+            Metadata to store with the export, e.g., the state of the index it was exported from.
+        """
+        def shard_file(shard, name):
+            return os.path.join(shard_path, f'shard-{shard:05d}.{name}.npy')
+
+        shard_indptrs = [np.load(shard_file(shard, 'indptr'), mmap_mode='r') for shard in range(num_shards)]
+        num_rows = sum(len(indptr) - 1 for indptr in shard_indptrs)
+        nnz = sum(int(indptr[-1]) for indptr in shard_indptrs)
+        # scipy requires indptr and indices to share a dtype, so only use int64 when int32 would overflow.
+        index_dtype = np.int32 if max(nnz, len(terms)) < 2 ** 31 else np.int64
+
+        with _atomic_directory(path, metadata) as tmp_path:
+            TermDictionary.write(os.path.join(tmp_path, 'terms'), terms, df, cf)
+
+            open_memmap = np.lib.format.open_memmap
+            indptr = open_memmap(os.path.join(tmp_path, 'indptr.npy'), mode='w+', dtype=index_dtype,
+                                 shape=(num_rows + 1,))
+            indices = open_memmap(os.path.join(tmp_path, 'indices.npy'), mode='w+', dtype=index_dtype, shape=(nnz,))
+            data = open_memmap(os.path.join(tmp_path, 'data.npy'), mode='w+', dtype=np.int32, shape=(nnz,))
+            indptr[0] = 0
+            row, offset = 0, 0
+            for shard, shard_indptr in enumerate(shard_indptrs):
+                shard_rows, shard_nnz = len(shard_indptr) - 1, int(shard_indptr[-1])
+                indptr[row + 1:row + shard_rows + 1] = shard_indptr[1:] + offset
+                indices[offset:offset + shard_nnz] = np.load(shard_file(shard, 'indices'))
+                data[offset:offset + shard_nnz] = np.load(shard_file(shard, 'data'))
+                row, offset = row + shard_rows, offset + shard_nnz
+            for array in (indptr, indices, data):
+                array.flush()
+            del indptr, indices, data, shard_indptrs
+
+            with open(os.path.join(tmp_path, 'matrix.json'), 'w') as f:
+                json.dump({'shape': [num_rows, len(terms)], 'nnz': nnz, 'shards': num_shards}, f)
+        shutil.rmtree(shard_path)
@@ -0,0 +1,265 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+This module provides an impact-ordered index of quantized BM25 postings, exported from a Lucene index, and a
+score-at-a-time searcher over it written in NumPy, for retrieval experiments without Lucene.
+"""
+
+import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from ._base import DocidMap, TermDictionary, _atomic_directory, _load_arrays, _save_arrays
+
+
+class ImpactIndex:
+    """Impact-ordered index: for each term, its postings sorted by decreasing quantized BM25 impact and grouped into
+    segments of equal impact, stored as NumPy arrays in a directory and loaded memory-mapped.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the exported index.
+    mmap : bool
+        Memory-map the arrays instead of reading them into memory.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        with open(os.path.join(path, 'impact.json')) as f:
+            self.metadata = json.load(f)
+        self.num_docs = self.metadata['num_docs']
+        self.scale = self.metadata['scale']
+        self.docids, self.impacts, self.segment_offsets, self.segment_impacts, self.term_segment_offsets = \
+            _load_arrays(path, ['postings.docids', 'postings.impacts', 'segments.offsets', 'segments.impacts',
+                                'segments.term_offsets'], mmap)
+        self.terms = TermDictionary(os.path.join(path, 'terms'), mmap=mmap)
+        self.docid_map = DocidMap(os.path.join(path, 'docids'), mmap=mmap)
+
+    @staticmethod
+    def write(path: str, weights: csr_matrix, terms: List[str], df: np.ndarray, cf: np.ndarray, docids: List[str],
+              bits: int = 8, metadata: Optional[Dict] = None):
+        """Quantize a document-term matrix of weights into impacts and write it to a directory as an impact-ordered
+        index. Weights are quantized linearly into ``2 ** bits - 1`` levels, with every non-zero weight receiving an
+        impact of at least 1. Rows whose collection ``docid`` is ``None``, i.e., deleted documents, get no postings.
+
+        Parameters
+        ----------
+        path : str
+            Directory to write to; replaced if it exists.
+        weights : csr_matrix
+            Document-term matrix of weights, e.g., BM25, with rows indexed by internal ``docid``.
+        terms : List[str]
+            Terms of the columns, in index order.
+        df : np.ndarray
+            Document frequency of each term.
+        cf : np.ndarray
+            Collection frequency of each term.
+        docids : List[str]
+            Collection ``docid`` of each row, or ``None`` for deleted documents.
+        bits : int
+            Number of bits per impact, at most 16.
+        metadata : Optional[Dict]
+            Additional metadata to store, e.g., the BM25 parameters.
+        """
+        if not 1 <= bits <= 16:
+            raise ValueError('bits must be between 1 and 16.')
+        levels = (1 << bits) - 1
+        num_terms = weights.shape[1]
+
+        # Deleted documents keep their term vectors until their segment is merged, so drop their weights here.
+        deleted = np.array([docid is None for docid in docids], dtype=bool)
+        if deleted.any():
+            weights = csr_matrix(weights, copy=True)
+            weights.data[np.repeat(deleted, np.diff(weights.indptr))] = 0
+            weights.eliminate_zeros()
+
+        postings = weights.tocsc()
+        max_weight = float(postings.data.max()) if postings.nnz > 0 else 1.0
+        impacts = np.clip(np.rint(postings.data / max_weight * levels), 1, levels)
+        impacts = impacts.astype(np.uint8 if bits <= 8 else np.uint16)
+        term_ids = np.repeat(np.arange(num_terms, dtype=np.int32), np.diff(postings.indptr))
+
+        # Sort the postings of each term by decreasing impact, breaking ties by docid.
+        order = np.lexsort((postings.indices, -impacts.astype(np.int32), term_ids))
+        postings_docids = postings.indices[order].astype(np.int32)
+        impacts = impacts[order]
+        term_ids = term_ids[order]
+
+        # A new segment starts wherever the term or the impact changes.
+        boundaries = np.ones(len(impacts), dtype=bool)
+        boundaries[1:] = (term_ids[1:] != term_ids[:-1]) | (impacts[1:] != impacts[:-1])
+        segment_starts = np.flatnonzero(boundaries)
+        segment_offsets = np.append(segment_starts, len(impacts)).astype(np.int64)
+        term_segment_offsets = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids[segment_starts], minlength=num_terms), out=term_segment_offsets[1:])
+
+        with _atomic_directory(path) as tmp_path:
+            _save_arrays(tmp_path, {'postings.docids': postings_docids, 'postings.impacts': impacts,
+                                    'segments.offsets': segment_offsets, 'segments.impacts': impacts[segment_starts],
+                                    'segments.term_offsets': term_segment_offsets})
+            TermDictionary.write(os.path.join(tmp_path, 'terms'), terms, df, cf)
+            DocidMap.write(os.path.join(tmp_path, 'docids'), docids)
+            with open(os.path.join(tmp_path, 'impact.json'), 'w') as f:
+                json.dump({**(metadata or {}), 'num_docs': weights.shape[0], 'bits': bits,
+                           'scale': max_weight / levels}, f)
+
+
+class ImpactSearcherResult:
+    """Class representing a single hit returned by :class:`ImpactSearcher`.
+
+    Parameters
+    ----------
+    docid : str
+        Collection ``docid``.
+    score : float
+        Score, i.e., the sum of the impacts of the query terms, scaled back to the range of the original weights.
+    """
+
+    def __init__(self, docid, score):
+        self.docid = docid
+        self.score = score
+
+    def __repr__(self):
+        return f'({self.docid}, {self.score:.6f})'
+
+
+class ImpactSearcher:
+    """Score-at-a-time searcher over an :class:`ImpactIndex`. For each query, the impact segments of all query terms
+    are processed in decreasing order of impact, accumulating integer scores per document; with a postings budget,
+    processing stops early once the budget is spent, trading effectiveness for speed ("anytime" ranking), since the
+    highest impacts have already been accumulated. Queries are bags of analyzed terms.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the exported impact index.
+    """
+
+    def __init__(self, path: str):
+        self.index = ImpactIndex(path)
+        self._accumulators = threading.local()
+
+    def _get_accumulator(self) -> np.ndarray:
+        # Each thread reuses one accumulator, which is cleared after every query by resetting only touched documents.
+        accumulator = getattr(self._accumulators, 'accumulator', None)
+        if accumulator is None:
+            accumulator = np.zeros(self.index.num_docs, dtype=np.int64)
+            self._accumulators.accumulator = accumulator
+        return accumulator
+
+    def _get_segments(self, terms: List[str]):
+        impacts, starts, ends = [], [], []
+        for term, count in Counter(terms).items():
+            term_id = self.index.terms.get_term_id(term)
+            if term_id < 0:
+                continue
+            first, last = self.index.term_segment_offsets[term_id], self.index.term_segment_offsets[term_id + 1]
+            # Repeated query terms count multiple times, as they do in Lucene's bag-of-words queries.
+            impacts.append(self.index.segment_impacts[first:last].astype(np.int64) * count)
+            starts.append(self.index.segment_offsets[first:last])
+            ends.append(self.index.segment_offsets[first + 1:last + 1])
+        if not impacts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        impacts, starts, ends = np.concatenate(impacts), np.concatenate(starts), np.concatenate(ends)
+        order = np.argsort(-impacts, kind='stable')
+        return impacts[order], starts[order], ends[order]
+
+    def search(self, q: Union[str, List[str]], k: int = 10,
+               max_postings: Optional[int] = None) -> List[ImpactSearcherResult]:
+        """Search the index.
+
+        Parameters
+        ----------
+        q : Union[str, List[str]]
+            Query as a list of analyzed terms, or as a string of whitespace-separated analyzed terms.
+        k : int
+            Number of hits to return.
+        max_postings : Optional[int]
+            Postings budget; processing stops after the segment during which the budget is exhausted. ``None`` scores
+            all postings of the query terms, which gives exact rankings.
+
+        Returns
+        -------
+        List[ImpactSearcherResult]
+            Hits, sorted by decreasing score with ties broken by internal ``docid``, as Lucene does.
+        """
+        terms = q.split() if isinstance(q, str) else q
+        impacts, starts, ends = self._get_segments(terms)
+
+        accumulator = self._get_accumulator()
+        touched = []
+        processed = 0
+        for impact, start, end in zip(impacts.tolist(), starts.tolist(), ends.tolist()):
+            if max_postings is not None and processed >= max_postings:
+                break
+            docids = self.index.docids[start:end]
+            # docids are unique within a segment, so fancy-indexed addition is safe.
+            accumulator[docids] += impact
+            touched.append(docids)
+            processed += end - start
+
+        if not touched:
+            return []
+        candidates = np.unique(np.concatenate(touched))
+        scores = accumulator[candidates]
+        accumulator[candidates] = 0
+
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            # Include all candidates tied with the k-th score, so that ties are broken by docid below.
+            top = np.flatnonzero(scores >= scores[top].min())
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((candidates, -scores))[:k]
+
+        docids = self.index.docid_map.convert_internal_docids_to_collection_docids(candidates[order])
+        return [ImpactSearcherResult(docid, float(score) * self.index.scale)
+                for docid, score in zip(docids, scores[order].tolist())]
+
+    def batch_search(self, queries: List[Union[str, List[str]]], qids: List[str], k: int = 10,
+                     max_postings: Optional[int] = None, threads: int = 1) -> Dict[str, List[ImpactSearcherResult]]:
+        """Search the index for multiple queries on a thread pool.
+
+        Parameters
+        ----------
+        queries : List[Union[str, List[str]]]
+            Queries, each as a list of analyzed terms or a string of whitespace-separated analyzed terms.
+        qids : List[str]
+            List of corresponding query ids.
+        k : int
+            Number of hits to return per query.
+        max_postings : Optional[int]
+            Postings budget per query, see :func:`search`.
+        threads : int
+            Number of threads to use.
+
+        Returns
+        -------
+        Dict[str, List[ImpactSearcherResult]]
+            Dictionary holding the search results, with the query ids as keys.
+        """
+        if len(queries) != len(qids):
+            raise ValueError('queries and qids must have the same length.')
+        with ThreadPoolExecutor(max_workers=max(int(threads), 1)) as executor:
+            results = executor.map(lambda q: self.search(q, k=k, max_postings=max_postings), queries)
+            return dict(zip(qids, results))
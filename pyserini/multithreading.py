@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import logging
 import threading
 
+logger = logging.getLogger(__name__)
+
 
 class ThreadSafeCount:
     
@@ -35,3 +38,74 @@ class Counters:
         self.skipped = ThreadSafeCount()
         self.errors = ThreadSafeCount()
 
+
+class PeriodicTask:
+    """Run a function every ``interval`` seconds on a daemon thread, until stopped. Exceptions raised by the function
+    are logged and do not stop the task.
+
+    Parameters
+    ----------
+    fn : Callable
+        Function to run, without arguments.
+    interval : float
+        Number of seconds between runs.
+    """
+
+    def __init__(self, fn, interval):
+        self.fn = fn
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.fn()
+            except Exception:
+                logger.exception('Periodic task failed')
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+class RefCounted:
+    """Reference count a resource shared by concurrent calls, closing it once the owner and every call holding it have
+    released it. The owner holds the initial reference, and releases it when the resource is retired.
+
+    Parameters
+    ----------
+    resource : object
+        Resource to share.
+    close : Callable
+        Function to close the resource, called with the resource. Defaults to its ``close`` method.
+    """
+
+    def __init__(self, resource, close=None):
+        self.resource = resource
+        self._close = close if close is not None else lambda resource: resource.close()
+        self._count = 1
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        """Take a reference on the resource, unless it has already been closed."""
+        with self._lock:
+            if self._count == 0:
+                return False
+            self._count += 1
+            return True
+
+    def release(self):
+        """Release a reference on the resource, closing it if it was the last one."""
+        with self._lock:
+            if self._count == 0:
+                return
+            self._count -= 1
+            if self._count > 0:
+                return
+        self._close(self.resource)
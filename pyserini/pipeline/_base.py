@@ -0,0 +1,543 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+This module provides a composable retrieval pipeline. Stages (retrieve, rerank, fuse, filter by qrels, write) are
+declared as a DAG and run topic by topic in a streaming fashion. The output of each stage is cached on disk, keyed by a
+hash of the stage's configuration and the configurations of all its upstream stages, so that changing a downstream
+parameter (e.g., the re-ranker's alpha) does not re-run the upstream stages.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from pyserini.fusion import FusionMethod, average, interpolation, reciprocal_rank_fusion
+from pyserini.trectools import Qrels, TrecRun
+
+logger = logging.getLogger(__name__)
+
+# Ranked list of a topic: docids and corresponding scores, in decreasing order of score.
+RankedList = Tuple[np.ndarray, np.ndarray]
+
+
+def _get_commit_generation(index_dir: str) -> int:
+    # Generation of the latest commit of a Lucene index, which changes whenever the index is updated. Like Lucene, read
+    # it off the names of the segments_N files (N in base 36), which avoids starting the JVM for cached stages.
+    return max((int(name[len('segments_'):], 36) for name in os.listdir(index_dir) if name.startswith('segments_')),
+               default=0)
+
+
+class Stage:
+    """Base class for a pipeline stage.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, used in reports and cache file names.
+    inputs : List[Stage]
+        Upstream stages whose outputs are fed to this stage.
+    """
+
+    cacheable = True
+
+    def __init__(self, name: str, inputs: List['Stage'] = None):
+        self.name = name
+        self.inputs = inputs if inputs is not None else []
+
+    def config(self) -> Dict:
+        """Return the JSON-serializable configuration that determines the output of this stage."""
+        raise NotImplementedError()
+
+    def cache_key(self) -> str:
+        """Return a hash of the configuration of this stage and of all its upstream stages."""
+        key = json.dumps({'stage': type(self).__name__, 'config': self.config(),
+                          'inputs': [stage.cache_key() for stage in self.inputs]}, sort_keys=True)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+    def process(self, topic: Union[int, str], query: str, inputs: List[RankedList]) -> RankedList:
+        """Compute the output of this stage for a single topic.
+
+        Parameters
+        ----------
+        topic : Union[int, str]
+            Topic id.
+        query : str
+            Query string of the topic.
+        inputs : List[RankedList]
+            Outputs of the upstream stages for this topic, in the order of ``self.inputs``.
+
+        Returns
+        -------
+        RankedList
+            Docids and scores, in decreasing order of score.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """Release any resources held by this stage."""
+        pass
+
+
+class RetrieveStage(Stage):
+    """Stage retrieving the top ``k`` hits for each topic with a ``SimpleSearcher``. The searcher is opened lazily, so
+    it is never opened if all topics are served from cache.
+
+    Parameters
+    ----------
+    index_dir : str
+        Path to Lucene index directory.
+    k : int
+        Number of hits to retrieve.
+    bm25 : Optional[Tuple[float, float]]
+        BM25 ``(k1, b)`` parameters; used unless ``qld`` is set.
+    qld : Optional[float]
+        Dirichlet smoothing parameter ``mu`` to score with query likelihood instead of BM25.
+    rm3 : Optional[Dict]
+        Keyword arguments for :meth:`SimpleSearcher.set_rm3`, or ``None`` to disable RM3.
+    name : str
+        Name of the stage.
+    """
+
+    def __init__(self, index_dir: str, k: int = 1000, bm25: Optional[Tuple[float, float]] = (0.9, 0.4),
+                 qld: Optional[float] = None, rm3: Optional[Dict] = None, name: str = 'retrieve'):
+        super().__init__(name)
+        self.index_dir = index_dir
+        self.k = k
+        self.bm25 = bm25
+        self.qld = qld
+        self.rm3 = rm3
+        self.searcher = None
+
+    def config(self) -> Dict:
+        return {'index': os.path.abspath(self.index_dir), 'generation': _get_commit_generation(self.index_dir),
+                'k': self.k, 'bm25': None if self.qld is not None else list(self.bm25), 'qld': self.qld,
+                'rm3': self.rm3}
+
+    def _get_searcher(self):
+        if self.searcher is None:
+            from pyserini.search import SimpleSearcher
+            self.searcher = SimpleSearcher(self.index_dir)
+            if self.qld is not None:
+                self.searcher.set_qld(self.qld)
+            else:
+                self.searcher.set_bm25(*self.bm25)
+            if self.rm3 is not None:
+                self.searcher.set_rm3(**self.rm3)
+        return self.searcher
+
+    def process(self, topic, query, inputs):
+        hits = self._get_searcher().search(query, self.k)
+        return np.array([hit.docid.strip() for hit in hits]), np.array([hit.score for hit in hits], dtype=np.float64)
+
+    def close(self):
+        if self.searcher is not None:
+            self.searcher.close()
+            self.searcher = None
+
+
+class RerankStage(Stage):
+    """Stage re-ranking the output of its input stage with a ``PseudoRelevanceClassifierReranker``, which is built
+    lazily. Topics with no more than ``r + n`` candidates are passed through unchanged.
+
+    Parameters
+    ----------
+    input : Stage
+        Stage whose output is re-ranked.
+    index_dir : str
+        Path to Lucene index directory.
+    vectorizer : str
+        Type of vectorizer, e.g., ``TfidfVectorizer``.
+    clf_type : List[ClassifierType]
+        Classifiers to use.
+    r : int
+        Number of positive labels in pseudo relevance feedback.
+    n : int
+        Number of negative labels in pseudo relevance feedback.
+    alpha : float
+        Alpha value for interpolation.
+    name : str
+        Name of the stage.
+    """
+
+    def __init__(self, input: Stage, index_dir: str, vectorizer: str, clf_type: List, r: int = 10, n: int = 100,
+                 alpha: float = 0.5, name: str = 'rerank'):
+        super().__init__(name, [input])
+        self.index_dir = index_dir
+        self.vectorizer = vectorizer
+        self.clf_type = clf_type
+        self.r = r
+        self.n = n
+        self.alpha = alpha
+        self.ranker = None
+
+    def config(self) -> Dict:
+        return {'index': os.path.abspath(self.index_dir), 'generation': _get_commit_generation(self.index_dir),
+                'vectorizer': self.vectorizer, 'clf_type': [t.value for t in self.clf_type], 'r': self.r, 'n': self.n,
+                'alpha': self.alpha}
+
+    def process(self, topic, query, inputs):
+        doc_ids, scores = inputs[0]
+        if len(doc_ids) <= self.r + self.n:
+            return doc_ids, scores
+
+        if self.ranker is None:
+            from pyserini.search.reranker import PseudoRelevanceClassifierReranker
+            self.ranker = PseudoRelevanceClassifierReranker(self.index_dir, self.vectorizer, self.clf_type,
+                                                            r=self.r, n=self.n, alpha=self.alpha)
+        scores, doc_ids = self.ranker.rerank(list(doc_ids), scores)
+        return np.asarray(doc_ids), np.asarray(scores, dtype=np.float64)
+
+    def close(self):
+        if self.ranker is not None:
+            self.ranker.close()
+            self.ranker = None
+
+
+class FuseStage(Stage):
+    """Stage fusing the outputs of its input stages with one of the methods in :mod:`pyserini.fusion`. Topics are fused
+    as they would be when fusing whole runs: inputs without results for a topic still count (e.g., towards averages),
+    and a topic with results from a single input gets that input's results rescored by the fusion method.
+
+    Parameters
+    ----------
+    inputs : List[Stage]
+        Stages whose outputs are fused.
+    method : FusionMethod
+        Fusion method.
+    rrf_k : int
+        Parameter k for reciprocal rank fusion.
+    alpha : float
+        Alpha value for interpolation.
+    depth : int
+        Maximum number of results from each input to consider.
+    k : int
+        Length of the fused results list.
+    name : str
+        Name of the stage.
+    """
+
+    def __init__(self, inputs: List[Stage], method: FusionMethod = FusionMethod.RRF, rrf_k: int = 60,
+                 alpha: float = 0.5, depth: int = 1000, k: int = 1000, name: str = 'fuse'):
+        super().__init__(name, inputs)
+        self.method = method
+        self.rrf_k = rrf_k
+        self.alpha = alpha
+        self.depth = depth
+        self.k = k
+
+    def config(self) -> Dict:
+        return {'method': self.method.value, 'rrf_k': self.rrf_k, 'alpha': self.alpha, 'depth': self.depth,
+                'k': self.k}
+
+    def process(self, topic, query, inputs):
+        runs = [TrecRun.from_search_results(list(zip(doc_ids, scores)), topic=topic)
+                for doc_ids, scores in inputs if len(doc_ids) > 0]
+        if len(runs) == 0:
+            return np.array([], dtype=str), np.array([], dtype=np.float64)
+        if len(runs) == 1:
+            position = next(i for i, (doc_ids, _) in enumerate(inputs) if len(doc_ids) > 0)
+            return self._rescore(*inputs[position], position, len(inputs))
+
+        if self.method == FusionMethod.RRF:
+            fused_run = reciprocal_rank_fusion(runs, rrf_k=self.rrf_k, depth=self.depth, k=self.k)
+        elif self.method == FusionMethod.INTERPOLATION:
+            fused_run = interpolation(runs, alpha=self.alpha, depth=self.depth, k=self.k)
+        elif self.method == FusionMethod.AVERAGE:
+            fused_run = average(runs, depth=self.depth, k=self.k)
+        else:
+            raise NotImplementedError(f'Fusion method {self.method} not implemented.')
+
+        rows = fused_run.to_numpy()
+        scores = rows[:, 4].astype(np.float64)
+        if self.method == FusionMethod.AVERAGE:
+            # Average over all inputs, including those without results for this topic.
+            scores *= len(runs) / len(inputs)
+        return rows[:, 2].astype(str), scores
+
+    def _rescore(self, doc_ids: np.ndarray, scores: np.ndarray, position: int, num_inputs: int) -> RankedList:
+        # Rescore the results of the only input with results for a topic, as the fusion methods would.
+        doc_ids, scores = doc_ids[:self.depth], np.asarray(scores[:self.depth], dtype=np.float64)
+        if self.method == FusionMethod.RRF:
+            scores = 1 / (self.rrf_k + np.arange(1, len(doc_ids) + 1, dtype=np.float64))
+        elif self.method == FusionMethod.INTERPOLATION:
+            scores = scores * (self.alpha if position == 0 else 1 - self.alpha)
+        elif self.method == FusionMethod.AVERAGE:
+            scores = scores / num_inputs
+        else:
+            raise NotImplementedError(f'Fusion method {self.method} not implemented.')
+
+        # Ties are broken by docid, as in TrecRun.merge.
+        order = np.lexsort((doc_ids, -scores))[:self.k]
+        return doc_ids[order], scores[order]
+
+
+class QrelsFilterStage(Stage):
+    """Stage retaining (or discarding) the docids of its input stage that are judged in the given qrels, like
+    :meth:`TrecRun.retain_qrels` and :meth:`TrecRun.discard_qrels`. Topics absent from the qrels are dropped.
+
+    Parameters
+    ----------
+    input : Stage
+        Stage whose output is filtered.
+    qrels_path : str
+        Path to the qrels file.
+    keep : bool
+        Retain judged docids if ``True``, discard them otherwise.
+    name : str
+        Name of the stage.
+    """
+
+    def __init__(self, input: Stage, qrels_path: str, keep: bool = True, name: str = 'filter'):
+        super().__init__(name, [input])
+        self.qrels_path = qrels_path
+        self.keep = keep
+        self.judged = None
+
+    def config(self) -> Dict:
+        with open(self.qrels_path, 'rb') as f:
+            qrels_md5 = hashlib.md5(f.read()).hexdigest()
+        return {'qrels': qrels_md5, 'keep': self.keep}
+
+    def process(self, topic, query, inputs):
+        if self.judged is None:
+            qrels = Qrels(self.qrels_path)
+            self.judged = {topic: set(qrels.get_docids(topic)) for topic in qrels.topics()}
+
+        doc_ids, scores = inputs[0]
+        if topic not in self.judged:
+            return doc_ids[:0], scores[:0]
+        mask = np.isin(doc_ids, list(self.judged[topic]))
+        if not self.keep:
+            mask = ~mask
+        return doc_ids[mask], scores[mask]
+
+
+class WriteStage(Stage):
+    """Sink stage writing the output of its input stage to a run file in TREC format, one topic at a time.
+
+    Parameters
+    ----------
+    input : Stage
+        Stage whose output is written.
+    output_path : str
+        Path to the run file.
+    tag : str
+        Run tag.
+    name : str
+        Name of the stage.
+    """
+
+    cacheable = False
+
+    def __init__(self, input: Stage, output_path: str, tag: str = 'Anserini', name: str = 'write'):
+        super().__init__(name, [input])
+        self.output_path = output_path
+        self.tag = tag
+        self.file = None
+
+    def config(self) -> Dict:
+        return {'output': self.output_path, 'tag': self.tag}
+
+    def process(self, topic, query, inputs):
+        if self.file is None:
+            self.file = open(self.output_path, 'w', buffering=1 << 20)
+        doc_ids, scores = inputs[0]
+        self.file.writelines([f'{topic} Q0 {doc_id} {i + 1} {score:.6f} {self.tag}\n'
+                              for i, (doc_id, score) in enumerate(zip(doc_ids, scores))])
+        return doc_ids, scores
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class StageCache:
+    """On-disk cache of the per-topic output of a stage, stored as JSON lines (one topic per line) in a file named
+    after the stage and its cache key. Lines are appended and flushed as topics complete, so an interrupted run still
+    leaves a usable partial cache.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding the cache files.
+    stage : Stage
+        Stage whose output is cached.
+    """
+
+    def __init__(self, cache_dir: str, stage: Stage):
+        self.path = os.path.join(cache_dir, f'{stage.name}-{stage.cache_key()}.jsonl')
+        self.entries = {}
+        self.file = None
+
+        if os.path.exists(self.path):
+            valid_offset = 0
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A partially written last line from an interrupted run.
+                        break
+                    self.entries[entry['topic']] = (np.array(entry['docids'], dtype=str),
+                                                    np.array(entry['scores'], dtype=np.float64))
+                    valid_offset += len(line)
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_offset)
+
+    def get(self, topic) -> Optional[RankedList]:
+        return self.entries.get(topic)
+
+    def put(self, topic, result: RankedList):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        doc_ids, scores = result
+        self.file.write(json.dumps({'topic': topic, 'docids': [str(d) for d in doc_ids],
+                                    'scores': [float(s) for s in scores]}) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class StageStats:
+    """Per-stage counters used to report throughput."""
+
+    def __init__(self):
+        self.computed = 0
+        self.cached = 0
+        self.seconds = 0.0
+
+    def throughput(self) -> float:
+        return self.computed / self.seconds if self.seconds > 0 else float('nan')
+
+
+class Pipeline:
+    """Retrieval pipeline over a DAG of stages. The pipeline streams topics through the stages one at a time; for each
+    topic, each stage reachable from ``sinks`` runs at most once, after all its inputs, unless its output for the topic
+    is already cached.
+
+    Parameters
+    ----------
+    sinks : List[Stage]
+        Final stages of the pipeline (typically :class:`WriteStage` instances); all their upstream stages are run.
+    cache_dir : Optional[str]
+        Directory for the stage caches; ``None`` disables caching.
+    """
+
+    def __init__(self, sinks: List[Stage], cache_dir: Optional[str] = None):
+        self.sinks = sinks
+        self.cache_dir = cache_dir
+        self.stages = self._topological_order()
+        self.stats = {stage: StageStats() for stage in self.stages}
+
+        names = [stage.name for stage in self.stages]
+        if len(set(names)) != len(names):
+            raise ValueError('Pipeline stages must have unique names.')
+
+    def _topological_order(self) -> List[Stage]:
+        order, visiting, visited = [], set(), set()
+
+        def visit(stage):
+            if stage in visited:
+                return
+            if stage in visiting:
+                raise ValueError(f'Pipeline has a cycle through stage {stage.name}.')
+            visiting.add(stage)
+            for upstream in stage.inputs:
+                visit(upstream)
+            visiting.remove(stage)
+            visited.add(stage)
+            order.append(stage)
+
+        for sink in self.sinks:
+            visit(sink)
+        return order
+
+    def run(self, queries: Dict[Union[int, str], str], verbose: bool = True) -> Dict[str, StageStats]:
+        """Run the pipeline over topics, in sorted topic order.
+
+        Parameters
+        ----------
+        queries : Dict[Union[int, str], str]
+            Query string of each topic, e.g., ``{topic: topics[topic]['title'] for topic in topics}`` from
+            :func:`pyserini.search.get_topics`.
+        verbose : bool
+            Print the per-stage report at the end.
+
+        Returns
+        -------
+        Dict[str, StageStats]
+            Statistics of each stage, keyed by stage name.
+        """
+        caches = {}
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            caches = {stage: StageCache(self.cache_dir, stage) for stage in self.stages if stage.cacheable}
+
+        def evaluate(stage, topic, outputs):
+            # Stages served from cache don't need their inputs, so upstream stages only run when actually needed.
+            if stage in outputs:
+                return outputs[stage]
+
+            cache = caches.get(stage)
+            result = cache.get(topic) if cache is not None else None
+            if result is not None:
+                self.stats[stage].cached += 1
+            else:
+                inputs = [evaluate(upstream, topic, outputs) for upstream in stage.inputs]
+                start = time.perf_counter()
+                result = stage.process(topic, queries[topic], inputs)
+                self.stats[stage].seconds += time.perf_counter() - start
+                self.stats[stage].computed += 1
+                if cache is not None:
+                    cache.put(topic, result)
+
+            outputs[stage] = result
+            return result
+
+        try:
+            for topic in sorted(queries.keys()):
+                # Outputs are only kept while the topic is in flight.
+                outputs = {}
+                for sink in self.sinks:
+                    evaluate(sink, topic, outputs)
+        finally:
+            for cache in caches.values():
+                cache.close()
+            for stage in self.stages:
+                stage.close()
+
+        if verbose:
+            print(self.report())
+        return {stage.name: self.stats[stage] for stage in self.stages}
+
+    def report(self) -> str:
+        """Return a table of per-stage computed and cached topics, time spent and throughput."""
+        lines = [f'{"stage":16} {"computed":>8} {"cached":>8} {"seconds":>10} {"topics/s":>10}']
+        for stage in self.stages:
+            stats = self.stats[stage]
+            lines.append(f'{stage.name:16} {stats.computed:8d} {stats.cached:8d} {stats.seconds:10.2f} '
+                         f'{stats.throughput():10.2f}')
+        return '\n'.join(lines)
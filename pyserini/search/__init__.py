@@ -14,10 +14,14 @@
 # limitations under the License.
 #
 
-from ._base import Document, JDocument, JQuery, get_topics, get_topics_with_reader
+from ._base import Document, JDocument, JQuery, JBagOfWordsQueryGenerator, JCovid19QueryGenerator, get_topics, \
+    get_topics_with_reader
 from ._searcher import JSimpleSearcherResult, LuceneSimilarities, SimpleFusionSearcher, SimpleSearcher
 from ._nearest_neighbor import SimpleNearestNeighborSearcher, JSimpleNearestNeighborSearcherResult
+from ._hybrid import HybridSearcher, HybridSearcherResult
 
-__all__ = ['Document', 'JDocument', 'JQuery', 'LuceneSimilarities', 'SimpleFusionSearcher', 'SimpleSearcher',
+__all__ = ['Document', 'JDocument', 'JQuery', 'JBagOfWordsQueryGenerator', 'JCovid19QueryGenerator',
+           'LuceneSimilarities', 'SimpleFusionSearcher', 'SimpleSearcher',
            'JSimpleSearcherResult', 'SimpleNearestNeighborSearcher', 'JSimpleNearestNeighborSearcherResult',
+           'HybridSearcher', 'HybridSearcherResult',
            'get_topics', 'get_topics_with_reader']
@@ -15,6 +15,11 @@
 #
 
 import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pyserini.search import get_topics, SimpleSearcher
 from pyserini.search.reranker import ClassifierType, PseudoRelevanceClassifierReranker
 from tqdm import tqdm
@@ -23,12 +28,17 @@ parser = argparse.ArgumentParser(description='Search a Lucene index.')
 parser.add_argument('--index', type=str, metavar='path to index', required=True, help="Path to Lucene index.")
 parser.add_argument('--topics', type=str, metavar='topic_name', required=True,
                     help="Name of topics. Available: robust04, robust05, core17, core18.")
-parser.add_argument('--output', type=str, metavar='path', help="Path to output file.")
+parser.add_argument('--output', type=str, metavar='path',
+                    help="Path to output file; with multiple --configs, path to the directory for the run files.")
 parser.add_argument('--bm25',  action='store_true', default=True, help="Use BM25 (default).")
 parser.add_argument('--rm3',  action='store_true', help="Use RM3")
 parser.add_argument('--qld',  action='store_true', help="Use QLD")
+parser.add_argument('--configs', type=str, nargs='+', metavar='config', default=[],
+                    help="Retrieval configurations to run in one go against the same index and topics, e.g., "
+                         "'bm25 bm25+rm3 qld qld+rm3'; overrides --bm25, --qld and --rm3.")
 parser.add_argument('--prcl',  type=ClassifierType, nargs='+', default=[],
-                    help='Specify the classifier PseudoRelevanceClassifierReranker uses.')
+                    help='Specify the classifier PseudoRelevanceClassifierReranker uses. '
+                         'Available: lr, svm, linear_svm, sgd.')
 parser.add_argument('--prcl.vectorizer',  dest='vectorizer', type=str,
                     help='Type of vectorizer. Available: TfidfVectorizer, BM25Vectorizer.')
 parser.add_argument('--prcl.r',  dest='r', type=int, default=10,
@@ -37,67 +47,196 @@ parser.add_argument('--prcl.n', dest='n', type=int, default=100,
                     help='Number of negative labels in pseudo relevance feedback.')
 parser.add_argument('--prcl.alpha', dest='alpha', type=float, default=0.5,
                     help='Alpha value for interpolation in pseudo relevance feedback.')
+parser.add_argument('--prcl.processes', dest='processes', type=int, default=1,
+                    help='Number of processes to spread the topics of each batch across when re-ranking.')
+parser.add_argument('--threads', type=int, metavar='num', default=1,
+                    help='Maximum number of threads to use for batch search.')
+parser.add_argument('--batch-size', dest='batch_size', type=int, metavar='num', default=1,
+                    help='Number of topics to search at once through batch search; 1 searches topics one by one.')
+parser.add_argument('--resume', action='store_true',
+                    help='Resume an interrupted run from its checkpoint, skipping topics that are already written.')
+parser.add_argument('--checkpoint-topics', dest='checkpoint_topics', type=int, metavar='num', default=100,
+                    help='Write a checkpoint at least every this many topics.')
+parser.add_argument('--checkpoint-interval', dest='checkpoint_interval', type=float, metavar='seconds', default=60,
+                    help='Write a checkpoint at least every this many seconds.')
 args = parser.parse_args()
 
 topics = get_topics(args.topics)
-searcher = SimpleSearcher(args.index)
-search_rankers = []
-
-if args.qld:
-    search_rankers.append('qld')
-    searcher.set_qld()
-else:
-    search_rankers.append('bm25')
-
-if args.rm3:
-    search_rankers.append('rm3')
-    searcher.set_rm3()
 
 # invalid topics name
 if topics == {}:
     print(f'Topic {args.topics} Not Found')
     exit()
 
+# get retrieval configurations
+if args.configs:
+    configs = args.configs
+else:
+    configs = ['+'.join(['qld' if args.qld else 'bm25'] + (['rm3'] if args.rm3 else []))]
+
+for config in configs:
+    tokens = config.split('+')
+    if tokens[0] not in ['bm25', 'qld'] or tokens[1:] not in [[], ['rm3']]:
+        raise ValueError(f'Invalid retrieval configuration {config}. Expected bm25 or qld, optionally with +rm3.')
+
+if len(set(configs)) != len(configs):
+    raise ValueError('Retrieval configurations must be distinct.')
+
 # get re-ranker
 use_prcl = args.prcl and len(args.prcl) > 0 and args.alpha > 0
 if use_prcl is True:
     ranker = PseudoRelevanceClassifierReranker(
         args.index, args.vectorizer, args.prcl, r=args.r, n=args.n, alpha=args.alpha)
+    # The re-ranker keeps per-call classifier state, so configurations running in parallel take turns using it.
+    ranker_lock = threading.Lock()
+
+
+def get_searcher(config: str) -> SimpleSearcher:
+    # Each configuration gets its own searcher since similarity and RM3 settings are per-searcher state; they all
+    # share the JVM, the (memory-mapped) index files and the topics loaded above.
+    searcher = SimpleSearcher(args.index)
+    tokens = config.split('+')
+    if tokens[0] == 'qld':
+        searcher.set_qld()
+    if 'rm3' in tokens:
+        searcher.set_rm3()
+    return searcher
+
+
+def get_output_path(config: str) -> str:
+    if args.output is not None and len(configs) == 1:
+        return args.output
 
-# build output path
-output_path = args.output
-if output_path is None:
     if use_prcl is True:
-        clf_rankers = []
-        for t in args.prcl:
-            if t == ClassifierType.LR:
-                clf_rankers.append('lr')
-            elif t == ClassifierType.SVM:
-                clf_rankers.append('svm')
+        clf_rankers = [t.value for t in args.prcl]
 
         r_str = f'prcl.r_{args.r}'
         n_str = f'prcl.n_{args.n}'
         a_str = f'prcl.alpha_{args.alpha}'
         clf_str = 'prcl_' + '+'.join(clf_rankers)
-        tokens1 = ['run', args.topics, '+'.join(search_rankers)]
+        tokens1 = ['run', args.topics, config]
         tokens2 = [args.vectorizer, clf_str, r_str, n_str, a_str]
         output_path = '.'.join(tokens1) + '-' + '-'.join(tokens2) + ".txt"
     else:
-        tokens = ['run', args.topics, '+'.join(search_rankers), 'txt']
+        tokens = ['run', args.topics, config, 'txt']
         output_path = '.'.join(tokens)
 
-print(f'Running {args.topics} topics, saving to {output_path}...')
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+        output_path = os.path.join(args.output, output_path)
+    return output_path
+
+
+topic_keys = sorted(topics.keys())
+batch_size = max(args.batch_size, 1)
+
+
+def get_run_settings(config: str) -> dict:
+    # Settings that determine the contents of a run file; a run can only be resumed with the same settings. The batch
+    # size and number of threads are left out, since they don't change the output.
+    settings = {'index': os.path.abspath(args.index), 'topics': args.topics, 'config': config, 'hits': 1000}
+    if use_prcl:
+        settings.update({'prcl': [t.value for t in args.prcl], 'vectorizer': args.vectorizer, 'r': args.r,
+                         'n': args.n, 'alpha': args.alpha})
+    return settings
 
-with open(output_path, 'w') as target_file:
-    for index, topic in enumerate(tqdm(sorted(topics.keys()))):
-        search = topics[topic].get('title')
-        hits = searcher.search(search, 1000)
-        doc_ids = [hit.docid.strip() for hit in hits]
-        scores = [hit.score for hit in hits]
 
-        if use_prcl and len(hits) > (args.r + args.n):
-            scores, doc_ids = ranker.rerank(doc_ids, scores)
+def run(config: str, position: int = 0):
+    searcher = get_searcher(config)
+    output_path = get_output_path(config)
+    tag = 'Anserini' if args.output is not None and len(configs) == 1 else os.path.basename(output_path)[:-4]
 
-        tag = output_path[:-4] if args.output is None else 'Anserini'
-        for i, (doc_id, score) in enumerate(zip(doc_ids, scores)):
-            target_file.write(f'{topic} Q0 {doc_id} {i + 1} {score:.6f} {tag}\n')
+    # Every --checkpoint-topics topics or --checkpoint-interval seconds, whichever comes first, the run file is flushed
+    # and a checkpoint recording the run settings, the number of completed topics and the corresponding byte offset
+    # into the run file is written next to it. On --resume, anything written past that offset (e.g., a partially
+    # written batch) is truncated and the completed topics are skipped.
+    checkpoint_path = output_path + '.checkpoint'
+    settings = get_run_settings(config)
+
+    def write_checkpoint(completed: int, offset: int):
+        tmp_path = checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'settings': settings, 'completed': completed, 'last_topic': str(topic_keys[completed - 1]),
+                       'offset': offset}, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    first = 0
+    mode = 'w'
+    if args.resume and os.path.exists(checkpoint_path) and os.path.exists(output_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        mismatched = sorted(key for key in settings.keys() | checkpoint.get('settings', {}).keys()
+                            if settings.get(key) != checkpoint.get('settings', {}).get(key))
+        if mismatched:
+            raise ValueError(f'Checkpoint {checkpoint_path} was written with different settings ('
+                             f'{", ".join(mismatched)}); rerun without --resume to start over.')
+        if checkpoint['completed'] > len(topic_keys) or \
+                str(topic_keys[checkpoint['completed'] - 1]) != checkpoint['last_topic']:
+            raise ValueError(f'Checkpoint {checkpoint_path} does not match topics {args.topics}.')
+        with open(output_path, 'r+b') as f:
+            f.truncate(checkpoint['offset'])
+        first = checkpoint['completed']
+        mode = 'a'
+        print(f'Resuming from checkpoint: {first}/{len(topic_keys)} topics already completed.')
+    elif args.resume:
+        print(f'No checkpoint found for {output_path}, starting from scratch.')
+
+    print(f'Running {args.topics} topics, saving to {output_path}...')
+
+    # Results are written in sorted topic order one batch at a time through a buffered writer, so the output is the
+    # same regardless of the batch size and the number of threads.
+    with open(output_path, mode, buffering=1 << 20) as target_file, \
+            tqdm(total=len(topic_keys), initial=first, desc=config, position=position) as progress:
+        checkpointed, checkpoint_time = first, time.monotonic()
+        for start in range(first, len(topic_keys), batch_size):
+            batch_topics = topic_keys[start:start + batch_size]
+            queries = [topics[topic].get('title') for topic in batch_topics]
+
+            if batch_size == 1 and args.threads == 1:
+                batch_hits = [searcher.search(queries[0], 1000)]
+            else:
+                qids = [str(topic) for topic in batch_topics]
+                results = searcher.batch_search(queries, qids, 1000, args.threads)
+                batch_hits = [results.get(qid, []) for qid in qids]
+
+            batch_doc_ids = [[hit.docid.strip() for hit in hits] for hits in batch_hits]
+            batch_scores = [[hit.score for hit in hits] for hits in batch_hits]
+
+            if use_prcl:
+                rerank_idx = [i for i, hits in enumerate(batch_hits) if len(hits) > (args.r + args.n)]
+                with ranker_lock:
+                    reranked = ranker.rerank_many([batch_doc_ids[i] for i in rerank_idx],
+                                                  [batch_scores[i] for i in rerank_idx], processes=args.processes)
+                for i, (scores, doc_ids) in zip(rerank_idx, reranked):
+                    batch_scores[i], batch_doc_ids[i] = scores, doc_ids
+
+            lines = []
+            for topic, doc_ids, scores in zip(batch_topics, batch_doc_ids, batch_scores):
+                for i, (doc_id, score) in enumerate(zip(doc_ids, scores)):
+                    lines.append(f'{topic} Q0 {doc_id} {i + 1} {score:.6f} {tag}\n')
+
+            target_file.writelines(lines)
+            completed = start + len(batch_topics)
+            if completed - checkpointed >= args.checkpoint_topics or \
+                    time.monotonic() - checkpoint_time >= args.checkpoint_interval:
+                target_file.flush()
+                write_checkpoint(completed, target_file.tell())
+                checkpointed, checkpoint_time = completed, time.monotonic()
+            progress.update(len(batch_topics))
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    searcher.close()
+
+
+if len(configs) == 1:
+    run(configs[0])
+else:
+    # Configurations run concurrently, each searching its topics with --threads threads.
+    with ThreadPoolExecutor(max_workers=len(configs)) as executor:
+        futures = [executor.submit(run, config, position) for position, config in enumerate(configs)]
+        for future in futures:
+            future.result()
+
+if use_prcl is True:
+    ranker.close()
@@ -0,0 +1,229 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+This module provides a hybrid searcher that combines sparse (BM25) retrieval from ``SimpleSearcher`` with dense
+retrieval from ``SimpleNearestNeighborSearcher`` by interpolating normalized scores.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ._nearest_neighbor import SimpleNearestNeighborSearcher
+from ._searcher import SimpleSearcher
+
+logger = logging.getLogger(__name__)
+
+
+class HybridSearcherResult:
+    """Class representing a single fused hit returned by :class:`HybridSearcher`.
+
+    Parameters
+    ----------
+    docid : str
+        Collection ``docid``.
+    score : float
+        Interpolated score.
+    sparse_score : float
+        Normalized score from the sparse searcher, 0 if the document was not retrieved by it.
+    dense_score : float
+        Normalized score from the dense searcher, 0 if the document was not retrieved by it.
+    """
+
+    def __init__(self, docid, score, sparse_score, dense_score):
+        self.docid = docid
+        self.score = score
+        self.sparse_score = sparse_score
+        self.dense_score = dense_score
+
+    def __repr__(self):
+        return f'({self.docid}, {self.score:.6f})'
+
+
+def _normalize(scores: np.ndarray) -> np.ndarray:
+    # Min-max normalization; mirrors RescoreMethod.NORMALIZE in trectools, where a zero-width range maps to 1.
+    if len(scores) == 0:
+        return scores
+    low = scores.min()
+    width = scores.max() - low
+    if width == 0:
+        return np.ones_like(scores)
+    return (scores - low) / width
+
+
+def fuse_hybrid_scores(sparse_docids: Sequence[str], sparse_scores: Sequence[float],
+                       dense_docids: Sequence[str], dense_scores: Sequence[float],
+                       alpha: float = 0.5, k: int = 10) -> List[HybridSearcherResult]:
+    """Fuse a sparse and a dense ranked list by min-max normalizing the scores of each list and interpolating them as
+    ``alpha * dense + (1 - alpha) * sparse``. A document missing from one of the lists receives a normalized score of
+    0 from that list. Ties are broken by ``docid`` so that the output is deterministic.
+
+    Parameters
+    ----------
+    sparse_docids : Sequence[str]
+        Docids retrieved by the sparse searcher.
+    sparse_scores : Sequence[float]
+        Corresponding sparse scores.
+    dense_docids : Sequence[str]
+        Docids retrieved by the dense searcher.
+    dense_scores : Sequence[float]
+        Corresponding dense scores.
+    alpha : float
+        Weight placed on the dense scores.
+    k : int
+        Number of fused hits to return.
+
+    Returns
+    -------
+    List[HybridSearcherResult]
+        Fused hits, sorted by decreasing score.
+    """
+    sparse_docids = np.asarray(sparse_docids, dtype=object)
+    dense_docids = np.asarray(dense_docids, dtype=object)
+    num_sparse = len(sparse_docids)
+
+    if num_sparse + len(dense_docids) == 0:
+        return []
+
+    docids, inverse = np.unique(np.concatenate([sparse_docids, dense_docids]).astype(str), return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    sparse = np.zeros(len(docids), dtype=np.float64)
+    dense = np.zeros(len(docids), dtype=np.float64)
+    sparse[inverse[:num_sparse]] = _normalize(np.asarray(sparse_scores, dtype=np.float64))
+    dense[inverse[num_sparse:]] = _normalize(np.asarray(dense_scores, dtype=np.float64))
+
+    fused = alpha * dense + (1 - alpha) * sparse
+    # np.unique returns docids sorted, so a stable sort on the negated scores breaks ties by docid.
+    top = np.argsort(-fused, kind='stable')[:k]
+
+    return [HybridSearcherResult(docids[i], float(fused[i]), float(sparse[i]), float(dense[i])) for i in top]
+
+
+class HybridSearcher:
+    """Searcher that runs a sparse ``SimpleSearcher`` and a dense ``SimpleNearestNeighborSearcher`` concurrently for
+    each query and fuses their results by interpolating normalized scores. Dense searches run on a small thread pool
+    that is created with the searcher and kept across queries, so call :meth:`close` once done searching.
+
+    Parameters
+    ----------
+    sparse_searcher : SimpleSearcher
+        Sparse searcher, e.g., configured for BM25.
+    dense_searcher : SimpleNearestNeighborSearcher
+        Dense nearest-neighbor searcher.
+    alpha : float
+        Weight placed on the dense scores; ``1 - alpha`` is placed on the sparse scores.
+    """
+
+    def __init__(self, sparse_searcher: SimpleSearcher, dense_searcher: SimpleNearestNeighborSearcher,
+                 alpha: float = 0.5):
+        self.sparse_searcher = sparse_searcher
+        self.dense_searcher = dense_searcher
+        self.alpha = alpha
+        self._executor = ThreadPoolExecutor(max_workers=2)
+
+    def close(self):
+        """Shut down the thread pool of the searcher, after the searches still running finish. The sparse and dense
+        searchers are left open, since they are owned by the caller."""
+        self._executor.shutdown()
+
+    def _sparse_search(self, q: str, k: int):
+        hits = self.sparse_searcher.search(q, k)
+        return [hit.docid for hit in hits], [hit.score for hit in hits]
+
+    def _dense_search(self, q: str, k: int):
+        hits = self.dense_searcher.search(q, k)
+        return [hit.id for hit in hits], [hit.score for hit in hits]
+
+    def search(self, q: str, dense_q: Optional[str] = None, k: int = 10, sparse_k: int = 1000,
+               dense_k: int = 1000) -> List[HybridSearcherResult]:
+        """Search the collection with both searchers concurrently and return the fused top-k.
+
+        Parameters
+        ----------
+        q : str
+            Query string for the sparse searcher.
+        dense_q : Optional[str]
+            Query (embedding id) for the dense searcher. Defaults to ``q``.
+        k : int
+            Number of fused hits to return.
+        sparse_k : int
+            Number of hits to retrieve from the sparse searcher before fusion.
+        dense_k : int
+            Number of hits to retrieve from the dense searcher before fusion.
+
+        Returns
+        -------
+        List[HybridSearcherResult]
+            List of fused search results.
+        """
+        dense_q = q if dense_q is None else dense_q
+        # The sparse search runs on the calling thread while the dense search runs on the pool.
+        dense = self._executor.submit(self._dense_search, dense_q, dense_k)
+        sparse_docids, sparse_scores = self._sparse_search(q, sparse_k)
+        dense_docids, dense_scores = dense.result()
+
+        return fuse_hybrid_scores(sparse_docids, sparse_scores, dense_docids, dense_scores, alpha=self.alpha, k=k)
+
+    def batch_search(self, queries: List[str], qids: List[str], dense_queries: Optional[List[str]] = None,
+                     k: int = 10, sparse_k: int = 1000, dense_k: int = 1000,
+                     threads: int = 1) -> Dict[str, List[HybridSearcherResult]]:
+        """Search the collection for multiple queries. Sparse retrieval goes through
+        :meth:`SimpleSearcher.batch_search` while dense retrieval runs concurrently on a thread pool, so the latency of
+        the faster retriever is hidden behind the slower one.
+
+        Parameters
+        ----------
+        queries : List[str]
+            List of query strings for the sparse searcher.
+        qids : List[str]
+            List of corresponding query ids.
+        dense_queries : Optional[List[str]]
+            List of queries (embedding ids) for the dense searcher. Defaults to ``queries``.
+        k : int
+            Number of fused hits to return per query.
+        sparse_k : int
+            Number of hits to retrieve from the sparse searcher before fusion.
+        dense_k : int
+            Number of hits to retrieve from the dense searcher before fusion.
+        threads : int
+            Maximum number of threads to use for each of the two searchers.
+
+        Returns
+        -------
+        Dict[str, List[HybridSearcherResult]]
+            Dictionary holding the fused results, with the query ids as keys.
+        """
+        dense_queries = queries if dense_queries is None else dense_queries
+        if len(queries) != len(qids) or len(dense_queries) != len(qids):
+            raise ValueError('queries, dense_queries and qids must have the same length.')
+
+        with ThreadPoolExecutor(max_workers=max(int(threads), 1) + 1) as executor:
+            sparse_future = executor.submit(self.sparse_searcher.batch_search, queries, qids, sparse_k, threads)
+            dense_futures = [executor.submit(self._dense_search, q, dense_k) for q in dense_queries]
+            sparse_results = sparse_future.result()
+
+            results = {}
+            for qid, dense_future in zip(qids, dense_futures):
+                hits = sparse_results.get(qid, [])
+                dense_docids, dense_scores = dense_future.result()
+                results[qid] = fuse_hybrid_scores([hit.docid for hit in hits], [hit.score for hit in hits],
+                                                  dense_docids, dense_scores, alpha=self.alpha, k=k)
+
+        return results
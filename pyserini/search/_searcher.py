@@ -20,10 +20,13 @@ class, which wraps the Java class with the same name in Anserini.
 """
 
 import logging
+import threading
+from contextlib import contextmanager
 from typing import Dict, List, Optional, Union
 
 from ._base import Document, JQuery, JQueryGenerator
-from pyserini.pyclass import autoclass, JString, JArrayList
+from pyserini.multithreading import PeriodicTask, RefCounted
+from pyserini.pyclass import autoclass, JString, JArrayList, JPaths
 from pyserini.trectools import TrecRun
 from pyserini.fusion import FusionMethod, reciprocal_rank_fusion
 
@@ -34,6 +37,19 @@ logger = logging.getLogger(__name__)
 JSimpleSearcher = autoclass('io.anserini.search.SimpleSearcher')
 JSimpleSearcherResult = autoclass('io.anserini.search.SimpleSearcher$Result')
 
+# Wrappers around Lucene classes
+JFSDirectory = autoclass('org.apache.lucene.store.FSDirectory')
+JSegmentInfos = autoclass('org.apache.lucene.index.SegmentInfos')
+
+
+def get_commit_generation(index_dir: str) -> int:
+    """Return the generation of the latest commit of a Lucene index, which changes whenever the index is updated."""
+    directory = JFSDirectory.open(JPaths.get(index_dir))
+    try:
+        return JSegmentInfos.getLastCommitGeneration(directory)
+    finally:
+        directory.close()
+
 
 class SimpleSearcher:
     """Wrapper class for ``SimpleSearcher`` in Anserini.
@@ -45,8 +61,16 @@ class SimpleSearcher:
     """
 
     def __init__(self, index_dir: str):
+        self.index_dir = index_dir
         self.object = JSimpleSearcher(JString(index_dir))
+        # Queries hold a reference on the Anserini searcher they run on, so that refresh() can retire it safely.
+        self._searcher = RefCounted(self.object)
         self.num_docs = self.object.getTotalNumDocuments()
+        # Configuration applied through set_* methods, replayed on the new Anserini searcher by refresh().
+        self._settings = {}
+        self._generation = get_commit_generation(index_dir)
+        self._refresh_lock = threading.Lock()
+        self._auto_refresh = None
 
     def search(self, q: Union[str, JQuery], k: int = 10, query_generator: JQueryGenerator = None, strip_segment_id=False, remove_dups=False) -> List[JSimpleSearcherResult]:
         """Search the collection.
@@ -70,19 +94,20 @@ class SimpleSearcher:
             List of search results.
         """
         hits = None
-        if query_generator:
-            hits = self.object.search(query_generator, JString(q), k)
-        elif isinstance(q, JQuery):
-            # Note that RM3 requires the notion of a query (string) to estimate the appropriate models. If we're just
-            # given a Lucene query, it's unclear what the "query" is for this estimation. One possibility is to extract
-            # all the query terms from the Lucene query, although this might yield unexpected behavior from the user's
-            # perspective. Until we think through what exactly is the "right thing to do", we'll raise an exception
-            # here explicitly.
-            if self.is_using_rm3():
-                raise NotImplementedError('RM3 incompatible with search using a Lucene query.')
-            hits = self.object.search(q, k)
-        else:
-            hits = self.object.search(JString(q.encode('utf8')), k)
+        with self._acquire() as searcher:
+            if query_generator:
+                hits = searcher.search(query_generator, JString(q), k)
+            elif isinstance(q, JQuery):
+                # Note that RM3 requires the notion of a query (string) to estimate the appropriate models. If we're
+                # just given a Lucene query, it's unclear what the "query" is for this estimation. One possibility is to
+                # extract all the query terms from the Lucene query, although this might yield unexpected behavior from
+                # the user's perspective. Until we think through what exactly is the "right thing to do", we'll raise
+                # an exception here explicitly.
+                if searcher.useRM3():
+                    raise NotImplementedError('RM3 incompatible with search using a Lucene query.')
+                hits = searcher.search(q, k)
+            else:
+                hits = searcher.search(JString(q.encode('utf8')), k)
 
         docids = set()
         filtered_hits = []
@@ -132,7 +157,8 @@ class SimpleSearcher:
             jqid = JString(qid)
             qid_strings.add(jqid)
 
-        results = self.object.batchSearch(query_strings, qid_strings, int(k), int(threads)).entrySet().toArray()
+        with self._acquire() as searcher:
+            results = searcher.batchSearch(query_strings, qid_strings, int(k), int(threads)).entrySet().toArray()
         return {r.getKey(): r.getValue() for r in results}
 
     def search_fields(self, q, f, boost, k):
@@ -154,7 +180,8 @@ class SimpleSearcher:
         List[JSimpleSearcherResult]
             List of document hits returned from search
         """
-        return self.object.searchFields(JString(q), JString(f), float(boost), k)
+        with self._acquire() as searcher:
+            return searcher.searchFields(JString(q), JString(f), float(boost), k)
 
     def set_analyzer(self, analyzer):
         """Set the Java ``Analyzer`` to use.
@@ -164,7 +191,7 @@ class SimpleSearcher:
         analyzer : JAnalyzer
             Java ``Analyzer`` object.
         """
-        self.object.setAnalyzer(analyzer)
+        self._configure('analyzer', 'setAnalyzer', analyzer)
 
     def set_rm3(self, fb_terms=10, fb_docs=10, original_query_weight=float(0.5), rm3_output_query=False):
         """Configure RM3 query expansion.
@@ -180,15 +207,18 @@ class SimpleSearcher:
         rm3_output_query : bool
             Print the original and expanded queries as debug output.
         """
-        self.object.setRM3(fb_terms, fb_docs, original_query_weight, rm3_output_query)
+        self._configure('rm3', 'setRM3', fb_terms, fb_docs, original_query_weight, rm3_output_query)
 
     def unset_rm3(self):
         """Disable RM3 query expansion."""
-        self.object.unsetRM3()
+        with self._refresh_lock:
+            self.object.unsetRM3()
+            self._settings.pop('rm3', None)
 
     def is_using_rm3(self) -> bool:
         """Check if RM3 query expansion is being performed."""
-        return self.object.useRM3()
+        with self._acquire() as searcher:
+            return searcher.useRM3()
 
     def set_qld(self, mu=float(1000)):
         """Configure query likelihood with Dirichlet smoothing as the scoring function.
@@ -198,7 +228,7 @@ class SimpleSearcher:
         mu : float
             Dirichlet smoothing parameter mu.
         """
-        self.object.setQLD(float(mu))
+        self._configure('similarity', 'setQLD', float(mu))
 
     def set_bm25(self, k1=float(0.9), b=float(0.4)):
         """Configure BM25 as the scoring function.
@@ -210,11 +240,12 @@ class SimpleSearcher:
         b : float
             BM25 b parameter.
         """
-        self.object.setBM25(float(k1), float(b))
+        self._configure('similarity', 'setBM25', float(k1), float(b))
 
     def get_similarity(self):
         """Return the Lucene ``Similarity`` used as the scoring function."""
-        return self.object.getSimilarity()
+        with self._acquire() as searcher:
+            return searcher.getSimilarity()
 
     def doc(self, docid: Union[str, int]) -> Optional[Document]:
         """Return the :class:`Document` corresponding to ``docid``. The ``docid`` is overloaded: if it is of type
@@ -232,7 +263,8 @@ class SimpleSearcher:
         Document
             :class:`Document` corresponding to the ``docid``.
         """
-        lucene_document = self.object.document(docid)
+        with self._acquire() as searcher:
+            lucene_document = searcher.document(docid)
         if lucene_document is None:
             return None
         return Document(lucene_document)
@@ -254,14 +286,80 @@ class SimpleSearcher:
         Document
             :class:`Document` whose ``field`` is ``id``.
         """
-        lucene_document = self.object.documentByField(JString(field), JString(q))
+        with self._acquire() as searcher:
+            lucene_document = searcher.documentByField(JString(field), JString(q))
         if lucene_document is None:
             return None
         return Document(lucene_document)
 
+    def refresh(self) -> bool:
+        """Reopen the searcher if the index has changed since it was opened, e.g., after new documents have been
+        indexed, keeping the current configuration (scoring function, RM3, analyzer). The new searcher is swapped in
+        atomically, so concurrent queries run either against the old or the new index. Queries that are still running on
+        the old searcher finish on it, and it is closed once the last of them returns.
+
+        Returns
+        -------
+        bool
+            Whether the index had changed and the searcher was reopened.
+        """
+        with self._refresh_lock:
+            generation = get_commit_generation(self.index_dir)
+            if generation == self._generation:
+                return False
+            searcher = JSimpleSearcher(JString(self.index_dir))
+            for method, args in self._settings.values():
+                getattr(searcher, method)(*args)
+            old, self._searcher = self._searcher, RefCounted(searcher)
+            self.object = searcher
+            self.num_docs = searcher.getTotalNumDocuments()
+            self._generation = generation
+        old.release()
+        logger.info(f'Refreshed searcher on {self.index_dir} to commit generation {generation}')
+        return True
+
+    def start_auto_refresh(self, interval: float = 60.0):
+        """Poll the index for changes in the background every ``interval`` seconds, calling :func:`refresh`.
+
+        Parameters
+        ----------
+        interval : float
+            Number of seconds between polls.
+        """
+        self.stop_auto_refresh()
+        self._auto_refresh = PeriodicTask(self.refresh, interval).start()
+
+    def stop_auto_refresh(self):
+        """Stop polling the index for changes."""
+        if self._auto_refresh is not None:
+            self._auto_refresh.stop()
+            self._auto_refresh = None
+
     def close(self):
-        """Close the searcher."""
-        self.object.close()
+        """Close the searcher. Queries that are still running finish first, before the searcher is closed."""
+        self.stop_auto_refresh()
+        self._searcher.release()
+
+    @contextmanager
+    def _acquire(self):
+        # Hold a reference on the current Anserini searcher for the duration of a call; see refresh().
+        while True:
+            searcher = self._searcher
+            if searcher.try_acquire():
+                break
+            if searcher is self._searcher:
+                raise ValueError('SimpleSearcher is closed.')
+        try:
+            yield searcher.resource
+        finally:
+            searcher.release()
+
+    def _configure(self, setting, method, *args):
+        # Apply a setting to the current Anserini searcher, and record it to be replayed by refresh(). Holding the
+        # refresh lock keeps a concurrent refresh from missing it.
+        with self._refresh_lock:
+            getattr(self.object, method)(*args)
+            self._settings[setting] = (method, args)
 
 
 class LuceneSimilarities:
@@ -18,10 +18,16 @@
 This module provides Pyserini's Python interface query building for Anserini.
 """
 import logging
+import threading
+from collections import OrderedDict
 from enum import Enum
+from typing import Dict, List, Tuple, Union
 
+import numpy as np
+
+from ._base import JBagOfWordsQueryGenerator
 from ..analysis import get_lucene_analyzer, Analyzer
-from ..pyclass import autoclass
+from ..pyclass import autoclass, JString
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +37,7 @@ JTerm = autoclass('org.apache.lucene.index.Term')
 JBooleanClause = autoclass('org.apache.lucene.search.BooleanClause')
 JBoostQuery = autoclass('org.apache.lucene.search.BoostQuery')
 JTermQuery = autoclass('org.apache.lucene.search.TermQuery')
+JQueryParser = autoclass('org.apache.lucene.queryparser.classic.QueryParser')
 
 # Wrappers around Anserini classes
 JQueryGeneratorUtils = autoclass('io.anserini.search.query.QueryGeneratorUtils')
@@ -69,8 +76,7 @@ def get_term_query(term, field="contents", analyzer=get_lucene_analyzer()):
     -------
     JTermQuery
     """
-    analyzer = Analyzer(analyzer)
-    return JTermQuery(JTerm(field, analyzer.analyze(term)[0]))
+    return JTermQuery(JTerm(field, Analyzer(analyzer).analyze(term)[0]))
 
 
 def get_boost_query(query, boost):
@@ -88,3 +94,191 @@ def get_boost_query(query, boost):
     JBoostQuery
     """
     return JBoostQuery(query, boost)
+
+
+# Characters with special meaning in Lucene's classic query syntax; mirrors QueryParser.escape() without the JNI call.
+_QUERY_SYNTAX_CHARS = set('\\+-!():^[]"{}~*?|&/')
+
+# Generator used by SimpleSearcher.search when none is specified.
+_default_query_generator = JBagOfWordsQueryGenerator()
+
+# Query parsers are not thread-safe, so each thread keeps its own, keyed by (default field, analyzer), for the most
+# recently used pairs. Analyzers from get_lucene_analyzer are shared per settings, so they map to the same parsers.
+_query_parsers = threading.local()
+_max_query_parsers = 32
+
+
+def _escape(term: str) -> str:
+    if term in ('AND', 'OR', 'NOT'):
+        return '\\' + term
+    return ''.join('\\' + c if c in _QUERY_SYNTAX_CHARS else c for c in term)
+
+
+def _get_query_parser(field, analyzer):
+    if not hasattr(_query_parsers, 'cache'):
+        _query_parsers.cache = OrderedDict()
+    cache = _query_parsers.cache
+    # Hold on to the analyzer along with its parser, so that its id can't be reused by another analyzer while cached.
+    key = (field, id(analyzer))
+    if key in cache:
+        cache.move_to_end(key)
+    else:
+        cache[key] = (analyzer, JQueryParser(JString(field), analyzer))
+        if len(cache) > _max_query_parsers:
+            cache.popitem(last=False)
+    return cache[key][1]
+
+
+def get_weighted_query(terms: Union[Dict[str, float], List[Tuple]], field='contents',
+                       analyzer=get_lucene_analyzer()):
+    """Build a query of weighted terms with a single call into Lucene. The terms are rendered into Lucene's query
+    syntax (with escaping) and handed to a cached ``QueryParser``, which analyzes all of them and assembles the
+    ``BooleanQuery`` of ``BoostQuery`` clauses in one go. Each term becomes a ``should`` clause; a term that analyzes to
+    several tokens becomes a boosted sub-query of those tokens, and a term that analyzes to nothing (e.g., a stopword)
+    is dropped.
+
+    Parameters
+    ----------
+    terms : Union[Dict[str, float], List[Tuple]]
+        Either a dictionary of terms to weights, or a list of ``(term, weight)`` or ``(term, weight, field)`` tuples.
+    field : str
+        Field to search, for terms that don't specify one.
+    analyzer : JAnalyzer
+        Analyzer to use for tokenizing the terms.
+
+    Returns
+    -------
+    JQuery
+    """
+    if isinstance(terms, dict):
+        terms = terms.items()
+
+    clauses = []
+    for t in terms:
+        term, weight, term_field = t[0], float(t[1]), (t[2] if len(t) > 2 else field)
+        if weight < 0:
+            raise ValueError(f'Negative weight {weight} for term {term}.')
+        # The query syntax has no exponent notation for boosts.
+        boost = np.format_float_positional(weight, trim='0')
+        clauses.append(f'{term_field}:({_escape(term)})^{boost}')
+
+    return _get_query_parser(field, analyzer).parse(JString(' '.join(clauses).encode('utf-8')))
+
+
+class QueryCache:
+    """Thread-safe LRU cache of generated Lucene queries, keyed by (query text, field, generator, analyzer).
+    Lucene queries are immutable, so a cached query can be shared across searchers and threads; reusing one skips the
+    analysis and query generation that ``SimpleSearcher.search`` would otherwise redo for every run.
+
+    Parameters
+    ----------
+    max_size : int
+        Maximum number of queries to keep.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self.queries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_query(self, q: str, query_generator=None, field='contents', analyzer=get_lucene_analyzer()):
+        """Return the query built by ``query_generator`` for ``q``, generating and caching it if necessary.
+
+        Parameters
+        ----------
+        q : str
+            Query text.
+        query_generator : JQueryGenerator
+            Generator to build the query, e.g., ``JCovid19QueryGenerator()``. Defaults to bag of words, as in
+            ``SimpleSearcher.search``. Generators are keyed by instance, since they may be configured differently;
+            reuse the same instance to share cached queries.
+        field : str
+            Field to search.
+        analyzer : JAnalyzer
+            Analyzer to use for tokenizing the query text.
+
+        Returns
+        -------
+        JQuery
+        """
+        if query_generator is None:
+            query_generator = _default_query_generator
+        key = (q, field, id(query_generator), id(analyzer))
+
+        with self.lock:
+            if key in self.queries:
+                self.queries.move_to_end(key)
+                self.hits += 1
+                return self.queries[key][0]
+            self.misses += 1
+
+        query = query_generator.buildQuery(JString(field), analyzer, JString(q.encode('utf-8')))
+
+        with self.lock:
+            # Each entry holds on to its generator and analyzer, so that their ids can't be reused while it is cached.
+            self.queries[key] = (query, query_generator, analyzer)
+            if len(self.queries) > self.max_size:
+                self.queries.popitem(last=False)
+        return query
+
+    def clear(self):
+        """Empty the cache."""
+        with self.lock:
+            self.queries.clear()
+
+
+class QueryTemplate:
+    """Query template with fixed clauses, e.g., the "COVID-19" keywords of UDel-style queries, that are compiled once
+    and then combined with per-topic queries, which only costs building a two-clause ``BooleanQuery``.
+
+    Parameters
+    ----------
+    fixed : Union[str, JQuery]
+        Fixed part of the query, either as query text (built with ``query_generator``) or as a Lucene query.
+    occur : str
+        How the fixed part must occur: one of ``should``, ``must``, ``must_not`` or ``filter``.
+    topic_occur : str
+        How the per-topic part must occur.
+    query_generator : JQueryGenerator
+        Generator to build queries from text. Defaults to bag of words.
+    field : str
+        Field to search.
+    analyzer : JAnalyzer
+        Analyzer to use for tokenizing query text.
+    cache : QueryCache
+        Cache to build the fixed and per-topic queries through; a new cache is created if not specified.
+    """
+
+    def __init__(self, fixed, occur='must', topic_occur='should', query_generator=None, field='contents',
+                 analyzer=get_lucene_analyzer(), cache: QueryCache = None):
+        self.cache = cache if cache is not None else QueryCache()
+        self.query_generator = query_generator
+        self.field = field
+        self.analyzer = analyzer
+        self.occur = JBooleanClauseOccur[occur].value
+        self.topic_occur = JBooleanClauseOccur[topic_occur].value
+        self.fixed = self._get_query(fixed)
+
+    def _get_query(self, q):
+        if isinstance(q, str):
+            return self.cache.get_query(q, self.query_generator, field=self.field, analyzer=self.analyzer)
+        return q
+
+    def combine(self, q):
+        """Combine the fixed part of the template with a per-topic query.
+
+        Parameters
+        ----------
+        q : Union[str, JQuery]
+            Per-topic query, either as query text or as a Lucene query.
+
+        Returns
+        -------
+        JQuery
+        """
+        builder = get_boolean_query_builder()
+        builder.add(self.fixed, self.occur)
+        builder.add(self._get_query(q), self.topic_occur)
+        return builder.build()
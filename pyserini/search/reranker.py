@@ -14,28 +14,61 @@
 
 import enum
 import importlib
+import multiprocessing
 import os
 import uuid
-from sklearn.linear_model import LogisticRegression
-from sklearn.svm import SVC
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.svm import SVC, LinearSVC
 from typing import List
 
 
 class ClassifierType(enum.Enum):
     LR = 'lr'
     SVM = 'svm'
+    LINEAR_SVM = 'linear_svm'
+    SGD = 'sgd'
 
 
 class FusionMethod(enum.Enum):
     AVG = 'avg'
 
 
+class CalibratedLinearSVC:
+    """Linear SVM for sparse inputs whose decision values are mapped to probabilities with Platt scaling fit once on
+    the training data. Unlike ``SVC(kernel='linear', probability=True)``, which runs an internal 5-fold cross-validation
+    to calibrate, this fits the SVM and the sigmoid exactly once.
+
+    Parameters
+    ----------
+    random_state : int
+        Seed for both the SVM and the sigmoid fit.
+    """
+
+    def __init__(self, random_state=42):
+        self.svm = LinearSVC(random_state=random_state)
+        self.sigmoid = LogisticRegression(random_state=random_state)
+
+    def fit(self, X, y):
+        self.svm.fit(X, y)
+        self.sigmoid.fit(self.svm.decision_function(X).reshape(-1, 1), y)
+        return self
+
+    def predict_proba(self, X):
+        return self.sigmoid.predict_proba(self.svm.decision_function(X).reshape(-1, 1))
+
+
 class PseudoRelevanceClassifierReranker:
     def __init__(self, lucene_index: str, vectorizer_class: str, clf_type: List[ClassifierType], r=10, n=100, alpha=0.5):
         self.r = r
         self.n = n
         self.alpha = alpha
         self.clf_type = clf_type
+        self._init_args = (lucene_index, vectorizer_class, clf_type, r, n, alpha)
+        self._executor = None
+        self._processes = None
 
         # get vectorizer
         module = importlib.import_module("pyserini.vectorizer")
@@ -50,72 +83,142 @@ class PseudoRelevanceClassifierReranker:
             self.clf = LogisticRegression(random_state=42)
         elif clf_type == ClassifierType.SVM:
             self.clf = SVC(kernel='linear', probability=True, random_state=42)
+        elif clf_type == ClassifierType.LINEAR_SVM:
+            self.clf = CalibratedLinearSVC(random_state=42)
+        elif clf_type == ClassifierType.SGD:
+            # modified_huber is the SGD loss that supports predict_proba.
+            self.clf = SGDClassifier(loss='modified_huber', random_state=42)
         else:
             raise Exception("Invalid classifier type")
 
     def _get_prf_vectors(self, doc_ids: List[str]):
-        train_docs = doc_ids[:self.r] + doc_ids[-self.n:]
-        train_labels = [1] * self.r + [0] * self.n
-
-        train_vecs = self.vectorizer.get_vectors(train_docs)
+        # The training docs (top r and bottom n) are a subset of the test docs, so vectorize the candidate list once
+        # and slice the training rows out of the test matrix.
         test_vecs = self.vectorizer.get_vectors(doc_ids)
 
+        num_docs = len(doc_ids)
+        train_idx = list(range(min(self.r, num_docs))) + list(range(max(num_docs - self.n, 0), num_docs))
+        train_vecs = test_vecs[train_idx]
+        train_labels = [1] * min(self.r, num_docs) + [0] * (len(train_idx) - min(self.r, num_docs))
+
         return train_vecs, train_labels, test_vecs
 
-    def _rerank_with_classifier(self, doc_ids: List[str], search_scores: List[float]):
-        train_vecs, train_labels, test_vecs = self._get_prf_vectors(doc_ids)
+    def _score_with_classifier(self, doc_ids: List[str], search_scores, prf_vectors=None) -> np.ndarray:
+        train_vecs, train_labels, test_vecs = self._get_prf_vectors(doc_ids) if prf_vectors is None else prf_vectors
 
         # classification
         self.clf.fit(train_vecs, train_labels)
-        pred = self.clf.predict_proba(test_vecs)
-        classifier_scores = self._normalize([p[1] for p in pred])
-        search_scores = self._normalize(search_scores)
+        classifier_scores = self._normalize(self.clf.predict_proba(test_vecs)[:, 1])
+        search_scores = self._normalize(np.asarray(search_scores, dtype=np.float64))
 
         # interpolation
-        interpolated_scores = [a * self.alpha + b * (1-self.alpha) for a, b in zip(classifier_scores, search_scores)]
+        return classifier_scores * self.alpha + search_scores * (1 - self.alpha)
 
+    def _rerank_with_classifier(self, doc_ids: List[str], search_scores, prf_vectors=None):
+        interpolated_scores = self._score_with_classifier(doc_ids, search_scores, prf_vectors)
         return self._sort_dual_list(interpolated_scores, doc_ids)
 
     def rerank(self, doc_ids: List[str], search_scores: List[float]):
+        """Re-rank a candidate list.
+
+        Parameters
+        ----------
+        doc_ids : List[str]
+            Candidate docids, in decreasing order of retrieval score.
+        search_scores : List[float]
+            Corresponding retrieval scores.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Re-ranked scores and docids, in decreasing order of score.
+        """
+        # vectorize the candidates once; the classifiers share the vectors
+        prf_vectors = self._get_prf_vectors(doc_ids)
+
         # one classifier
         if len(self.clf_type) == 1:
             self._set_classifier(self.clf_type[0])
-            return self._rerank_with_classifier(doc_ids, search_scores)
+            return self._rerank_with_classifier(doc_ids, search_scores, prf_vectors)
 
         # two classifier with FusionMethod.AVG
-        doc_score_dict = {}
-        for i in range(2):
-            self._set_classifier(self.clf_type[i])
-            i_scores, i_doc_ids = self._rerank_with_classifier(doc_ids, search_scores)
-
-            for score, doc_id in zip(i_scores, i_doc_ids):
-                if doc_id not in doc_score_dict:
-                    doc_score_dict[doc_id] = set()
-                doc_score_dict[doc_id].add(score)
-
-        r_scores, r_doc_ids = [], []
-        for doc_id, score in doc_score_dict.items():
-            avg = sum(score) / len(score)
-            r_doc_ids.append(doc_id)
-            r_scores.append(avg)
-
-        return r_scores, r_doc_ids
-
-    def _normalize(self, scores: List[float]):
-        low = min(scores)
-        high = max(scores)
-        width = high - low
-
-        return [(s-low)/width for s in scores]
-
-    # sort both list in decreasing order by using the list1 to compare
-    def _sort_dual_list(self, list1, list2):
-        zipped_lists = zip(list1, list2)
-        sorted_pairs = sorted(zipped_lists)
-
-        tuples = zip(*sorted_pairs)
-        list1, list2 = [list(tuple) for tuple in tuples]
-
-        list1.reverse()
-        list2.reverse()
-        return list1, list2
+        scores = np.zeros(len(doc_ids), dtype=np.float64)
+        for clf_type in self.clf_type:
+            self._set_classifier(clf_type)
+            scores += self._score_with_classifier(doc_ids, search_scores, prf_vectors)
+
+        return self._sort_dual_list(scores / len(self.clf_type), doc_ids)
+
+    def rerank_many(self, doc_ids_list: List[List[str]], search_scores_list: List[List[float]], processes: int = None):
+        """Re-rank the candidate lists of many topics, spreading the topics across a pool of worker processes.
+
+        Each worker process builds its own re-ranker (and thus its own vectorizer and classifier state) once, when the
+        pool is created, so the pool is kept around across calls until :meth:`close` is called. Results are returned
+        in the same order as the input and are identical to calling :meth:`rerank` on each topic.
+
+        Parameters
+        ----------
+        doc_ids_list : List[List[str]]
+            Candidate docids of each topic.
+        search_scores_list : List[List[float]]
+            Corresponding retrieval scores of each topic.
+        processes : int
+            Number of worker processes. Defaults to the number of CPUs; set to 1 to re-rank in the current process.
+
+        Returns
+        -------
+        List[Tuple[List[float], List[str]]]
+            Re-ranked scores and docids of each topic.
+        """
+        if processes is None:
+            processes = os.cpu_count()
+
+        if processes <= 1 or len(doc_ids_list) <= 1:
+            return [self.rerank(doc_ids, search_scores)
+                    for doc_ids, search_scores in zip(doc_ids_list, search_scores_list)]
+
+        if self._executor is None or self._processes != processes:
+            self.close()
+            # Workers are spawned rather than forked since the JVM does not survive a fork.
+            self._executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker, initargs=self._init_args)
+            self._processes = processes
+
+        return list(self._executor.map(_rerank_in_worker, doc_ids_list, search_scores_list))
+
+    def close(self):
+        """Shut down the worker processes used by :meth:`rerank_many`, if any."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._processes = None
+
+    def _normalize(self, scores: np.ndarray) -> np.ndarray:
+        low = scores.min()
+        width = scores.max() - low
+
+        # all scores are equal: mirror RescoreMethod.NORMALIZE in trectools and map them to 1
+        if width == 0:
+            return np.ones_like(scores)
+
+        return (scores - low) / width
+
+    # sort both arrays in decreasing order of scores, breaking ties by decreasing docid
+    def _sort_dual_list(self, scores: np.ndarray, doc_ids: List[str]):
+        doc_ids = np.asarray(doc_ids)
+        order = np.lexsort((doc_ids, scores))[::-1]
+        return scores[order], doc_ids[order]
+
+
+# Re-ranker owned by each worker process of PseudoRelevanceClassifierReranker.rerank_many.
+_worker_reranker = None
+
+
+def _init_worker(lucene_index, vectorizer_class, clf_type, r, n, alpha):
+    global _worker_reranker
+    _worker_reranker = PseudoRelevanceClassifierReranker(lucene_index, vectorizer_class, clf_type, r=r, n=n,
+                                                         alpha=alpha)
+
+
+def _rerank_in_worker(doc_ids: List[str], search_scores: List[float]):
+    return _worker_reranker.rerank(doc_ids, search_scores)
@@ -0,0 +1,101 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Benchmark ImpactSearcher, the NumPy score-at-a-time searcher over quantized BM25 impacts exported from a Lucene index,
+against SimpleSearcher.batch_search on the same index and topics. Reports throughput and the overlap of the top-k
+results with Lucene's, and optionally writes both runs so that effectiveness can be compared with trec_eval, e.g.:
+
+python scripts/benchmark_impact_searcher.py --index indexes/lucene-index.robust04.pos+docvectors+raw \
+    --topics robust04 --threads 8 --max-postings 0 100000
+"""
+
+import argparse
+import os
+import time
+
+from pyserini.export import ImpactSearcher
+from pyserini.index import IndexReader
+from pyserini.search import get_topics, SimpleSearcher
+
+
+def write_run(path, results, tag):
+    with open(path, 'w') as f:
+        for qid, hits in results.items():
+            for rank, hit in enumerate(hits, start=1):
+                f.write(f'{qid} Q0 {hit.docid} {rank} {hit.score:.6f} {tag}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ImpactSearcher against SimpleSearcher.')
+    parser.add_argument('--index', type=str, required=True, help='Path to Lucene index, built with -storeDocvectors.')
+    parser.add_argument('--topics', type=str, required=True, help='Name of topics, e.g., robust04.')
+    parser.add_argument('--hits', type=int, default=1000, help='Number of hits per topic.')
+    parser.add_argument('--k1', type=float, default=0.9, help='BM25 k1 parameter.')
+    parser.add_argument('--b', type=float, default=0.4, help='BM25 b parameter.')
+    parser.add_argument('--bits', type=int, default=8, help='Number of bits per quantized impact.')
+    parser.add_argument('--threads', type=int, default=1, help='Number of threads for both searchers.')
+    parser.add_argument('--max-postings', dest='max_postings', type=int, nargs='+', default=[0],
+                        help='Postings budgets of ImpactSearcher to benchmark; 0 scores all postings.')
+    parser.add_argument('--output-dir', dest='output_dir', type=str, help='Directory to write runs to.')
+    args = parser.parse_args()
+
+    topics = get_topics(args.topics)
+    qids = sorted(topics.keys())
+    queries = [topics[qid].get('title') for qid in qids]
+    qids = [str(qid) for qid in qids]
+
+    index_reader = IndexReader(args.index)
+    start = time.perf_counter()
+    impact_index = index_reader.get_impact_index(k1=args.k1, b=args.b, bits=args.bits, threads=args.threads)
+    print(f'Impact index ready in {time.perf_counter() - start:.1f}s')
+    impact_searcher = ImpactSearcher(impact_index.path)
+    # ImpactSearcher takes analyzed queries, so analysis is done up front and not timed.
+    analyzed_queries = [index_reader.analyze(query) for query in queries]
+
+    searcher = SimpleSearcher(args.index)
+    searcher.set_bm25(args.k1, args.b)
+    start = time.perf_counter()
+    lucene_results = searcher.batch_search(queries, qids, args.hits, args.threads)
+    lucene_time = time.perf_counter() - start
+    lucene_results = {qid: lucene_results.get(qid, []) for qid in qids}
+
+    print(f'{"searcher":24} {"qps":>10} {"overlap@10":>10} {f"overlap@{args.hits}":>12}')
+    print(f'{"SimpleSearcher":24} {len(qids) / lucene_time:10.1f} {1:10.3f} {1:12.3f}')
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        write_run(os.path.join(args.output_dir, f'run.{args.topics}.lucene-bm25.txt'), lucene_results, 'Lucene')
+
+    for max_postings in args.max_postings:
+        start = time.perf_counter()
+        impact_results = impact_searcher.batch_search(analyzed_queries, qids, k=args.hits,
+                                                      max_postings=max_postings or None, threads=args.threads)
+        impact_time = time.perf_counter() - start
+
+        overlaps = []
+        for depth in (10, args.hits):
+            overlap = [len({hit.docid for hit in impact_results[qid][:depth]} &
+                           {hit.docid for hit in lucene_results[qid][:depth]}) / depth for qid in qids]
+            overlaps.append(sum(overlap) / len(overlap))
+        name = f'ImpactSearcher ({max_postings or "all"})'
+        print(f'{name:24} {len(qids) / impact_time:10.1f} {overlaps[0]:10.3f} {overlaps[1]:12.3f}')
+        if args.output_dir:
+            write_run(os.path.join(args.output_dir, f'run.{args.topics}.impact-bm25-{max_postings or "all"}.txt'),
+                      impact_results, 'Impact')
+
+
+if __name__ == '__main__':
+    main()
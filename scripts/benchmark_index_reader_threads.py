@@ -0,0 +1,75 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Benchmark the throughput of one IndexReader shared by concurrent threads, as in feature extraction, with and without
+pooled mode. Each task fetches the term statistics and the postings of the terms of one topic. Throughput is reported
+in topics per second for each number of threads, e.g.:
+
+python scripts/benchmark_index_reader_threads.py --index indexes/lucene-index.robust04.pos+docvectors+raw \
+    --topics robust04 --threads 1 2 4 8 16 32
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pyserini.index import IndexReader
+from pyserini.search import get_topics
+
+
+def extract(index_reader, terms, positions):
+    index_reader.batch_get_term_counts(terms, analyzer=None)
+    for term in terms:
+        index_reader.get_postings_arrays(term, analyzer=None, positions=positions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent throughput of IndexReader.')
+    parser.add_argument('--index', type=str, required=True, help='Path to Lucene index.')
+    parser.add_argument('--topics', type=str, required=True, help='Name of topics, e.g., robust04.')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32],
+                        help='Numbers of threads to benchmark.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of passes over the topics per measurement.')
+    parser.add_argument('--positions', action='store_true', default=False, help='Also fetch positions.')
+    args = parser.parse_args()
+
+    topics = get_topics(args.topics)
+    readers = {'default': IndexReader(args.index), 'pooled': IndexReader(args.index, pooled=True)}
+    # Terms are analyzed up front and not timed, so that only index access is measured.
+    queries = [readers['default'].analyze(topics[qid].get('title')) for qid in sorted(topics.keys())]
+    queries = [terms for terms in queries if terms] * args.repeat
+
+    print(f'{"threads":>8} ' + ' '.join(f'{name + " (topics/s)":>20}' for name in readers))
+    for threads in args.threads:
+        throughputs = []
+        for index_reader in readers.values():
+            # Warm up, so that every thread of the pool has attached to the JVM and, in pooled mode, created its enums.
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(lambda terms: extract(index_reader, terms, args.positions), queries[:threads * 4]))
+                # Term statistics are memoized, so drop those of the warm-up to keep measuring lookups.
+                index_reader._term_counts_cache.clear()
+                start = time.perf_counter()
+                list(executor.map(lambda terms: extract(index_reader, terms, args.positions), queries))
+                throughputs.append(len(queries) / (time.perf_counter() - start))
+        print(f'{threads:8d} ' + ' '.join(f'{throughput:20.1f}' for throughput in throughputs))
+
+    for index_reader in readers.values():
+        index_reader.close()
+
+
+if __name__ == '__main__':
+    main()
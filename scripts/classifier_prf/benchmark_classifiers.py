@@ -0,0 +1,113 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Benchmark the classifiers of PseudoRelevanceClassifierReranker against each other and against the BM25 run they
+re-rank. Reports the per-topic re-ranking time of each classifier and, given qrels, the MAP and nDCG@20 of every run
+as computed by trec_eval. The runs are written to the output directory, e.g.:
+
+python scripts/classifier_prf/benchmark_classifiers.py --index indexes/lucene-index.robust04.pos+docvectors+raw \
+    --topics robust04 --qrels tools/topics-and-qrels/qrels.robust04.txt
+"""
+
+import argparse
+import os
+import subprocess
+import time
+
+import numpy as np
+
+from pyserini.search import get_topics, SimpleSearcher
+from pyserini.search.reranker import ClassifierType, PseudoRelevanceClassifierReranker
+
+
+def write_run(path, results, tag):
+    with open(path, 'w') as f:
+        for qid, (scores, doc_ids) in results.items():
+            for rank, (doc_id, score) in enumerate(zip(doc_ids, scores), start=1):
+                f.write(f'{qid} Q0 {doc_id} {rank} {score:.6f} {tag}\n')
+
+
+def evaluate(trec_eval, qrels, path):
+    output = subprocess.run([trec_eval, '-m', 'map', '-m', 'ndcg_cut.20', qrels, path],
+                            check=True, capture_output=True, text=True).stdout
+    metrics = dict((line.split()[0], float(line.split()[2])) for line in output.splitlines() if line.strip())
+    return metrics['map'], metrics['ndcg_cut_20']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the PRF classifiers of PseudoRelevanceClassifierReranker.')
+    parser.add_argument('--index', type=str, required=True, help='Path to Lucene index, built with -storeDocvectors.')
+    parser.add_argument('--topics', type=str, required=True, help='Name of topics, e.g., robust04.')
+    parser.add_argument('--vectorizer', type=str, default='TfidfVectorizer',
+                        help='Type of vectorizer. Available: TfidfVectorizer, BM25Vectorizer.')
+    parser.add_argument('--classifiers', type=ClassifierType, nargs='+', default=list(ClassifierType),
+                        help='Classifiers to benchmark; all by default.')
+    parser.add_argument('--hits', type=int, default=1000, help='Number of hits per topic.')
+    parser.add_argument('--r', type=int, default=10, help='Number of positive labels in pseudo relevance feedback.')
+    parser.add_argument('--n', type=int, default=100, help='Number of negative labels in pseudo relevance feedback.')
+    parser.add_argument('--alpha', type=float, default=0.5, help='Alpha value for interpolation.')
+    parser.add_argument('--max-topics', dest='max_topics', type=int, help='Only use the first N topics.')
+    parser.add_argument('--qrels', type=str, help='Qrels to evaluate the runs with.')
+    parser.add_argument('--trec-eval', dest='trec_eval', type=str, default='tools/eval/trec_eval.9.0.4/trec_eval',
+                        help='Path to the trec_eval binary.')
+    parser.add_argument('--output-dir', dest='output_dir', type=str, default='runs', help='Directory to write runs to.')
+    args = parser.parse_args()
+
+    topics = get_topics(args.topics)
+    qids = sorted(topics.keys())[:args.max_topics]
+
+    # Retrieve once, so that every classifier re-ranks the same candidates.
+    searcher = SimpleSearcher(args.index)
+    baseline = {}
+    for qid in qids:
+        hits = searcher.search(topics[qid].get('title'), args.hits)
+        baseline[qid] = [hit.score for hit in hits], [hit.docid.strip() for hit in hits]
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f'{"run":12} {"topics":>6} {"mean (ms)":>10} {"p50 (ms)":>10} {"max (ms)":>10} {"MAP":>8} {"nDCG@20":>8}')
+
+    def report(name, path, timings):
+        metrics = evaluate(args.trec_eval, args.qrels, path) if args.qrels else (float('nan'), float('nan'))
+        timings = np.array(timings) if timings else np.full(1, np.nan)
+        print(f'{name:12} {len(qids):6d} {timings.mean():10.2f} {np.median(timings):10.2f} {timings.max():10.2f} '
+              f'{metrics[0]:8.4f} {metrics[1]:8.4f}')
+
+    output_path = os.path.join(args.output_dir, f'run.{args.topics}.bm25.txt')
+    write_run(output_path, baseline, 'bm25')
+    report('bm25', output_path, [])
+
+    for clf_type in args.classifiers:
+        ranker = PseudoRelevanceClassifierReranker(args.index, args.vectorizer, [clf_type], r=args.r, n=args.n,
+                                                   alpha=args.alpha)
+        results, timings = {}, []
+        for qid, (scores, doc_ids) in baseline.items():
+            # As in pyserini.search, topics with too few hits to label are left as retrieved.
+            if len(doc_ids) <= args.r + args.n:
+                results[qid] = scores, doc_ids
+                continue
+            # Timings include vectorizing the candidates, which costs the same for every classifier.
+            start = time.perf_counter()
+            results[qid] = ranker.rerank(doc_ids, scores)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        output_path = os.path.join(args.output_dir, f'run.{args.topics}.bm25-prcl_{clf_type.value}.txt')
+        write_run(output_path, results, f'prcl_{clf_type.value}')
+        report(clf_type.value, output_path, timings)
+
+
+if __name__ == '__main__':
+    main()
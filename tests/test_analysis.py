@@ -50,6 +50,11 @@ class TestAnalyzers(unittest.TestCase):
         hits_second = self.searcher.search('information retrieval')
         self.assertNotEqual(hits_first, hits_second)
 
+    def test_analyzers_are_shared(self):
+        self.assertTrue(analysis.get_lucene_analyzer() is analysis.get_lucene_analyzer(name='English'))
+        self.assertTrue(analysis.get_lucene_analyzer(stemming=False) is analysis.get_lucene_analyzer(stemming=False))
+        self.assertFalse(analysis.get_lucene_analyzer() is analysis.get_lucene_analyzer(stemming=False))
+
     def test_analyze_with_analyzer(self):
         analyzer = analysis.get_lucene_analyzer(stemming=False)
         self.assertTrue(isinstance(analyzer, JAnalyzer))
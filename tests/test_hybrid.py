@@ -0,0 +1,104 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tarfile
+import unittest
+from random import randint
+from typing import Dict, List
+from urllib.request import urlretrieve
+
+from pyserini.search import HybridSearcher, HybridSearcherResult, SimpleNearestNeighborSearcher, SimpleSearcher
+
+
+class TestHybridSearch(unittest.TestCase):
+    def setUp(self):
+        # Download pre-built CACM index and vectors index; append a random value to avoid filename clashes.
+        r = randint(0, 10000000)
+        self.collection_url = 'https://github.com/castorini/anserini-data/raw/master/CACM/lucene-index.cacm.tar.gz'
+        self.tarball_name = 'lucene-index.cacm-{}.tar.gz'.format(r)
+        self.index_dir = 'index{}/'.format(r)
+
+        self.vectors_url = 'https://www.dropbox.com/s/p1syrnphxpb2sw2/lucene-index-vectors.cacm.tar.gz?dl=1'
+        self.vectors_tarball_name = 'lucene-index-vectors.cacm-{}.tar.gz'.format(r)
+        self.vectors_dir = 'vectors{}/'.format(r)
+
+        for url, tarball_name, target_dir in [(self.collection_url, self.tarball_name, self.index_dir),
+                                              (self.vectors_url, self.vectors_tarball_name, self.vectors_dir)]:
+            urlretrieve(url, tarball_name)
+            tarball = tarfile.open(tarball_name)
+            tarball.extractall(target_dir)
+            tarball.close()
+
+        self.searcher = SimpleSearcher(f'{self.index_dir}lucene-index.cacm')
+        self.nnsearcher = SimpleNearestNeighborSearcher(f'{self.vectors_dir}lucene-index-vectors.cacm')
+
+    def test_hybrid(self):
+        hybrid = HybridSearcher(self.searcher, self.nnsearcher, alpha=0.5)
+        hits = hybrid.search('information retrieval', dense_q='CACM-3134', k=10)
+
+        self.assertTrue(isinstance(hits, List))
+        self.assertEqual(len(hits), 10)
+        self.assertTrue(isinstance(hits[0], HybridSearcherResult))
+        for h1, h2 in zip(hits, hits[1:]):
+            self.assertGreaterEqual(h1.score, h2.score)
+        for hit in hits:
+            self.assertAlmostEqual(hit.score, 0.5 * hit.sparse_score + 0.5 * hit.dense_score, places=6)
+
+        # CACM-3134 is both the top BM25 hit and the query embedding itself.
+        self.assertEqual(hits[0].docid, 'CACM-3134')
+        self.assertAlmostEqual(hits[0].score, 1.0, places=6)
+
+        # The thread pool is reused across queries, and shut down by close().
+        self.assertEqual([hit.docid for hit in hybrid.search('information retrieval', dense_q='CACM-3134', k=10)],
+                         [hit.docid for hit in hits])
+        hybrid.close()
+        with self.assertRaises(RuntimeError):
+            hybrid.search('information retrieval', dense_q='CACM-3134', k=10)
+
+    def test_hybrid_alpha_zero(self):
+        # With all weight on the sparse scores, the fused ranking must match BM25.
+        hybrid = HybridSearcher(self.searcher, self.nnsearcher, alpha=0.0)
+        hits = hybrid.search('information retrieval', dense_q='CACM-0059', k=10)
+        bm25_hits = self.searcher.search('information retrieval', 10)
+
+        self.assertEqual([hit.docid for hit in hits][:3], [hit.docid for hit in bm25_hits][:3])
+        hybrid.close()
+
+    def test_hybrid_batch(self):
+        hybrid = HybridSearcher(self.searcher, self.nnsearcher, alpha=0.5)
+        results = hybrid.batch_search(['information retrieval', 'search'], ['q1', 'q2'],
+                                      dense_queries=['CACM-3134', 'CACM-3058'], k=10, threads=2)
+
+        self.assertTrue(isinstance(results, Dict))
+        for qid, q, dense_q in [('q1', 'information retrieval', 'CACM-3134'), ('q2', 'search', 'CACM-3058')]:
+            hits = hybrid.search(q, dense_q=dense_q, k=10)
+            self.assertEqual([hit.docid for hit in results[qid]], [hit.docid for hit in hits])
+            for h1, h2 in zip(results[qid], hits):
+                self.assertAlmostEqual(h1.score, h2.score, places=6)
+        hybrid.close()
+
+    def tearDown(self):
+        self.searcher.close()
+        os.remove(self.tarball_name)
+        os.remove(self.vectors_tarball_name)
+        shutil.rmtree(self.index_dir)
+        shutil.rmtree(self.vectors_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
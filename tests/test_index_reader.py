@@ -17,15 +17,18 @@
 import os
 import shutil
 import tarfile
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from random import randint
 from urllib.request import urlretrieve
 
+import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.naive_bayes import MultinomialNB
 
-from pyserini import analysis, index, search
-from pyserini.pyclass import JString
+from pyserini import analysis, export, index, search
+from pyserini.pyclass import autoclass, JPaths, JString
 from pyserini.vectorizer import BM25Vectorizer, TfidfVectorizer
 
 
@@ -94,6 +97,72 @@ class TestIndexUtils(unittest.TestCase):
         self.assertEqual(index_term.df, 1)
         self.assertEqual(index_term.cf, 1)
 
+    def test_term_dictionary(self):
+        terms, df, cf = self.index_reader.get_term_dictionary()
+        self.assertEqual(len(terms), 14363)
+        self.assertEqual(len(df), 14363)
+        self.assertEqual(len(cf), 14363)
+        self.assertEqual(terms[0], '0')
+        self.assertEqual(df[0], 19)
+        self.assertEqual(cf[0], 30)
+        self.assertEqual(terms[1], '0,1')
+
+        # Should match the statistics returned by terms().
+        for i, index_term in enumerate(self.index_reader.terms()):
+            if i == 100:
+                break
+            self.assertEqual(index_term.term, terms[i])
+            self.assertEqual(index_term.df, df[i])
+            self.assertEqual(index_term.cf, cf[i])
+
+        i = list(terms).index('retriev')
+        self.assertEqual(df[i], 138)
+        self.assertEqual(cf[i], 275)
+
+        # Filtering by df.
+        terms_filtered, df_filtered, cf_filtered = self.index_reader.get_term_dictionary(min_df=5, max_df=1000)
+        mask = (df >= 5) & (df <= 1000)
+        self.assertEqual(list(terms_filtered), list(terms[mask]))
+        self.assertTrue((df_filtered == df[mask]).all())
+        self.assertTrue((cf_filtered == cf[mask]).all())
+
+        # Round trip through disk.
+        path = os.path.join(self.index_dir, 'terms')
+        self.index_reader.get_term_dictionary(path=path)
+        term_dictionary = export.TermDictionary(path)
+        self.assertEqual(len(term_dictionary), 14363)
+        self.assertEqual(term_dictionary.term(0), '0')
+        self.assertEqual(list(term_dictionary.terms()), list(terms))
+        self.assertTrue((term_dictionary.df == df).all())
+        self.assertTrue((term_dictionary.cf == cf).all())
+
+    def test_segment_analytics(self):
+        # Per-segment results come back in segment order, and cover all documents.
+        max_docs = self.index_reader.map_reduce_segments(lambda leaf_reader, doc_base: (doc_base, leaf_reader.maxDoc()),
+                                                         threads=2)
+        self.assertEqual(max_docs[0][0], 0)
+        self.assertEqual(sum(max_doc for _, max_doc in max_docs), 3204)
+        self.assertEqual(self.index_reader.map_reduce_segments(lambda leaf_reader, doc_base: leaf_reader.numDocs(),
+                                                               sum, threads=2), 3204)
+
+        terms, df, cf = self.index_reader.get_term_dictionary()
+        segment_terms, segment_df, segment_cf = self.index_reader.get_segment_term_stats(threads=4)
+        self.assertEqual(list(segment_terms), list(terms))
+        self.assertEqual(list(segment_df), list(df))
+        self.assertEqual(list(segment_cf), list(cf))
+
+        field_stats = self.index_reader.get_field_stats(threads=4)
+        self.assertEqual(field_stats['contents']['documents'], self.index_reader.stats()['non_empty_documents'])
+        self.assertEqual(field_stats['contents']['total_terms'], self.index_reader.stats()['total_terms'])
+        self.assertEqual(field_stats['contents']['postings'], df.sum())
+        self.assertEqual(field_stats['id']['documents'], 3204)
+
+        lengths, counts = self.index_reader.get_document_length_distribution(threads=4)
+        self.assertTrue((lengths[1:] > lengths[:-1]).all())
+        self.assertEqual(counts.sum(), self.index_reader.stats()['non_empty_documents'])
+        norm_lengths = self.index_reader.get_document_lengths().norm_lengths
+        self.assertEqual(list(np.repeat(lengths, counts)), sorted(norm_lengths[norm_lengths > 0]))
+
     def test_analyze(self):
         self.assertEqual(' '.join(self.index_reader.analyze('retrieval')), 'retriev')
         self.assertEqual(' '.join(self.index_reader.analyze('rapid retrieval, space economy')),
@@ -124,6 +193,24 @@ class TestIndexUtils(unittest.TestCase):
         self.assertEqual(df_no_stopword, 326)
         self.assertEqual(cf_no_stopword, 443)
 
+    def test_batch_term_stats(self):
+        terms = ['retrieval', 'on', 'zoölogy', 'retrieval', 'information retrieval', 'retrieve']
+        df, cf = self.index_reader.batch_get_term_counts(terms)
+        for i, term in enumerate(terms):
+            expected_df, expected_cf = self.index_reader.get_term_counts(term)
+            self.assertEqual(df[i], expected_df)
+            self.assertEqual(cf[i], -1 if expected_cf is None else expected_cf)
+        self.assertEqual(list(df[[0, 3, 5]]), [138, 138, 138])
+        self.assertEqual(list(cf[[0, 3, 5]]), [275, 275, 275])
+
+        df, cf = self.index_reader.batch_get_term_counts(['retriev', 'retrieval', 'on'], analyzer=None)
+        self.assertEqual(list(df), [138, 0, 326])
+        self.assertEqual(list(cf), [275, 0, 443])
+
+        df, cf = self.index_reader.batch_get_term_counts([])
+        self.assertEqual(len(df), 0)
+        self.assertEqual(len(cf), 0)
+
     def test_postings1(self):
         term = 'retrieval'
         postings = list(self.index_reader.get_postings_list(term))
@@ -159,6 +246,75 @@ class TestIndexUtils(unittest.TestCase):
         self.assertEqual(self.index_reader.get_postings_list('zoölogy', analyzer=None), None)
         self.assertEqual(self.index_reader.get_postings_list('zoölogy'), None)
 
+    def test_postings_arrays(self):
+        postings = self.index_reader.get_postings_list('retrieval')
+        postings_arrays = self.index_reader.get_postings_arrays('retrieval')
+        self.assertEqual(len(postings_arrays), 138)
+        self.assertEqual(postings_arrays.docids.dtype, np.int32)
+        self.assertEqual(postings_arrays.tfs.dtype, np.int32)
+        self.assertIsNone(postings_arrays.positions)
+        self.assertEqual(list(postings_arrays.docids), [posting.docid for posting in postings])
+        self.assertEqual(list(postings_arrays.tfs), [posting.tf for posting in postings])
+        self.assertEqual(postings_arrays.tfs.sum(), 275)
+
+        postings_arrays = self.index_reader.get_postings_arrays('retriev', analyzer=None, positions=True)
+        self.assertEqual(len(postings_arrays.position_offsets), 139)
+        self.assertEqual(len(postings_arrays.positions), 275)
+        for i, posting in enumerate(postings):
+            start, end = postings_arrays.position_offsets[i], postings_arrays.position_offsets[i + 1]
+            self.assertEqual(list(postings_arrays.positions[start:end]), list(posting.positions))
+
+        self.assertIsNone(self.index_reader.get_postings_arrays('asdf'))
+        self.assertIsNone(self.index_reader.get_postings_arrays('retrieval', analyzer=None))
+        self.assertIsNone(self.index_reader.get_postings_arrays('zoölogy'))
+
+        results = self.index_reader.batch_get_postings_arrays(['retrieval', 'retrieve', 'asdf'])
+        self.assertEqual(len(results), 3)
+        self.assertEqual(list(results['retrieval'].docids), list(results['retrieve'].docids))
+        self.assertIsNone(results['asdf'])
+
+    def test_pooled_concurrent(self):
+        terms = ['retrieval', 'information', 'computer', 'system', 'asdf', 'algorithm']
+        expected_postings = {term: self.index_reader.get_postings_arrays(term) for term in terms}
+        expected_df, expected_cf = self.index_reader.batch_get_term_counts(terms)
+
+        index_reader = index.IndexReader(self.index_path, pooled=True)
+
+        def check(i):
+            term = terms[i % len(terms)]
+            postings = index_reader.get_postings_arrays(term, positions=i % 2 == 0)
+            df, cf = index_reader.batch_get_term_counts(terms)
+            return term, postings, df, cf
+
+        # Enums are reused within each thread, so results must not bleed across calls or threads.
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for term, postings, df, cf in executor.map(check, range(48)):
+                if expected_postings[term] is None:
+                    self.assertIsNone(postings)
+                else:
+                    self.assertEqual(list(postings.docids), list(expected_postings[term].docids))
+                    self.assertEqual(list(postings.tfs), list(expected_postings[term].tfs))
+                self.assertEqual(list(df), list(expected_df))
+                self.assertEqual(list(cf), list(expected_cf))
+        index_reader.close()
+
+    def test_concurrent_exports(self):
+        # Readers exporting to the same paths at once, rebuilding or not, each get a complete export, and leave no
+        # working directories behind.
+        path = os.path.join(self.index_dir, 'exports')
+        index_readers = [self.index_reader, index.IndexReader(self.index_path)]
+
+        def export_all(i):
+            index_reader = index_readers[i % 2]
+            docid_map = index_reader.get_docid_map(path=os.path.join(path, 'docids'), rebuild=i % 3 == 0)
+            lengths = index_reader.get_document_lengths(path=os.path.join(path, 'doclengths'), rebuild=i % 3 == 1)
+            return len(docid_map), len(lengths.lengths)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual(set(executor.map(export_all, range(12))), {(3204, 3204)})
+        self.assertEqual(sorted(os.listdir(path)), ['docids', 'doclengths'])
+        index_readers[1].close()
+
     def test_doc_vector(self):
         doc_vector = self.index_reader.get_document_vector('CACM-3134')
         self.assertEqual(len(doc_vector), 94)
@@ -183,6 +339,124 @@ class TestIndexUtils(unittest.TestCase):
                 # The tf values should match.
                 self.assertEqual(postings_list[i].tf, 8)
 
+    def test_doc_vectors(self):
+        docids = ['CACM-3134', 'CACM-0002', 'fake_docid', 'CACM-0239']
+        matrix, vocabulary = self.index_reader.get_document_vectors(docids)
+        self.assertEqual(matrix.shape, (4, 14363))
+        self.assertEqual(len(vocabulary), 14363)
+        self.assertEqual(matrix[0].nnz, 94)
+        self.assertEqual(matrix[0, vocabulary['inform']], 8)
+        self.assertEqual(matrix[0, vocabulary['retriev']], 7)
+        self.assertEqual(matrix[2].nnz, 0)
+
+        for i, docid in enumerate(docids):
+            doc_vector = self.index_reader.get_document_vector(docid) or {}
+            self.assertEqual({term: matrix[i, vocabulary[term]] for term in doc_vector}, doc_vector)
+            self.assertEqual(matrix[i].sum(), sum(doc_vector.values()))
+
+        # Term ids are stable, and reading in parallel gives the same matrix.
+        parallel_matrix, parallel_vocabulary = self.index_reader.get_document_vectors(docids, threads=3)
+        self.assertEqual(parallel_vocabulary, vocabulary)
+        self.assertEqual((parallel_matrix != matrix).nnz, 0)
+
+    def test_batch_term_positions(self):
+        docids = ['CACM-3134', 'fake_docid', 'CACM-0239']
+        positions = self.index_reader.batch_get_term_positions(docids)
+        self.assertEqual(len(positions), 3)
+        self.assertEqual(positions.term_ids.dtype, np.int32)
+        self.assertEqual(positions.positions.dtype, np.int32)
+        self.assertEqual(len(positions[1][0]), 0)
+
+        terms = {i: term for term, i in positions.vocabulary.items()}
+        for i, docid in enumerate(docids):
+            term_ids, doc_positions = positions[i]
+            self.assertTrue(np.all(np.diff(doc_positions) >= 0))
+            expected = {}
+            for term_id, position in zip(term_ids.tolist(), doc_positions.tolist()):
+                expected.setdefault(terms[term_id], []).append(position)
+            self.assertEqual(expected, self.index_reader.get_term_positions(docid) or {})
+
+        # Restricting to terms of interest, which are analyzed.
+        positions = self.index_reader.batch_get_term_positions(docids, terms=['information', 'retrieval', 'faketerm'],
+                                                               threads=2)
+        term_positions = self.index_reader.get_term_positions('CACM-3134')
+        term_ids, doc_positions = positions[0]
+        self.assertEqual(len(doc_positions), len(term_positions['inform']) + len(term_positions['retriev']))
+        self.assertEqual(doc_positions[term_ids == positions.vocabulary['inform']].tolist(), term_positions['inform'])
+
+    def test_doc_lengths(self):
+        doc_lengths = self.index_reader.get_document_lengths()
+        self.assertEqual(len(doc_lengths), 3204)
+        self.assertEqual(doc_lengths.lengths.dtype, np.int32)
+        self.assertEqual(doc_lengths.lengths.sum(), self.index_reader.stats()['total_terms'])
+
+        for docid in ['CACM-3134', 'CACM-0002', 'CACM-0239']:
+            internal_docid = self.index_reader.convert_collection_docid_to_internal_docid(docid)
+            doc_vector = self.index_reader.get_document_vector(docid)
+            self.assertEqual(doc_lengths.lengths[internal_docid], sum(doc_vector.values()))
+            self.assertEqual(doc_lengths.unique_terms[internal_docid], len(doc_vector))
+        self.assertEqual(doc_lengths.unique_terms[self.index_reader.convert_collection_docid_to_internal_docid(
+            'CACM-3134')], 94)
+
+        # Norms are lossy, but stay close to the actual lengths.
+        self.assertTrue((np.abs(doc_lengths.norm_lengths - doc_lengths.lengths) <= doc_lengths.lengths * 0.125).all())
+
+        # Loads from the cache.
+        self.assertTrue(os.path.isdir(os.path.join(self.index_reader.export_dir, 'doclengths')))
+        self.assertEqual(list(self.index_reader.get_document_lengths().lengths), list(doc_lengths.lengths))
+
+        # Other fields are exported separately; docids are stored without term vectors or norms.
+        id_lengths = self.index_reader.get_document_lengths(field='id')
+        self.assertEqual(id_lengths.metadata['field'], 'id')
+        self.assertTrue(os.path.isdir(os.path.join(self.index_reader.export_dir, 'doclengths-id')))
+        self.assertEqual(id_lengths.lengths.sum(), 0)
+        self.assertEqual(id_lengths.norm_lengths.sum(), 0)
+
+    def test_doc_term_matrix(self):
+        path = os.path.join(self.index_dir, 'docterms')
+        doc_term_matrix = self.index_reader.get_document_term_matrix(path=path, chunk_size=500, threads=4)
+        matrix = doc_term_matrix.matrix
+        self.assertEqual(matrix.shape, (3204, 14363))
+        self.assertEqual(matrix.sum(), self.index_reader.stats()['total_terms'])
+        self.assertTrue(matrix.has_sorted_indices)
+        self.assertEqual(doc_term_matrix.terms.term(0), '0')
+
+        # Rows are internal docids, and should match get_document_vectors.
+        docids = ['CACM-3134', 'CACM-0002', 'CACM-0239']
+        vectors, vocabulary = self.index_reader.get_document_vectors(docids)
+        internal_docids = [self.index_reader.convert_collection_docid_to_internal_docid(docid) for docid in docids]
+        self.assertEqual((matrix[internal_docids] != vectors).nnz, 0)
+        self.assertEqual(matrix[internal_docids[0], vocabulary['inform']], 8)
+
+        # Document frequencies of the columns should match the term dictionary.
+        _, df, _ = self.index_reader.get_term_dictionary()
+        self.assertEqual(list((matrix > 0).sum(axis=0).A1), list(df))
+
+        # Loads from the cache.
+        self.assertEqual(self.index_reader.get_document_term_matrix(path=path).matrix.nnz, matrix.nnz)
+
+    def test_impact_searcher(self):
+        impact_index = self.index_reader.get_impact_index(bits=16)
+        impact_searcher = export.ImpactSearcher(impact_index.path)
+        self.assertEqual(impact_index.num_docs, 3204)
+
+        for query in ['information retrieval', 'databases', 'space economy']:
+            hits = self.searcher.search(query)
+            impact_hits = impact_searcher.search(self.index_reader.analyze(query))
+            self.assertEqual(len(impact_hits), 10)
+            # With 16-bit impacts, rankings and scores should be nearly identical to Lucene's.
+            self.assertGreaterEqual(len({hit.docid for hit in hits} & {hit.docid for hit in impact_hits}), 9)
+            self.assertAlmostEqual(impact_hits[0].score, hits[0].score, delta=0.01)
+
+        # A postings budget returns a subset of the postings' scores.
+        impact_hits = impact_searcher.search('inform retriev', k=10, max_postings=10)
+        self.assertLessEqual(len(impact_hits), 10)
+        self.assertEqual(impact_searcher.search('fox'), [])
+
+        results = impact_searcher.batch_search(['inform retriev', 'databas'], ['q1', 'q2'], k=5, threads=2)
+        self.assertEqual([hit.docid for hit in results['q1']],
+                         [hit.docid for hit in impact_searcher.search('inform retriev', k=5)])
+
     def test_term_position(self):
         term_positions = self.index_reader.get_term_positions('CACM-3134')
         self.assertEqual(len(term_positions), 94)
@@ -278,12 +552,81 @@ class TestIndexUtils(unittest.TestCase):
                                0., places=5)
         self.assertAlmostEqual(self.index_reader.compute_bm25_term_weight('CACM-3134', 'fox'), 0., places=5)
 
+    def test_bm25_weights_batch(self):
+        docids = ['CACM-3134', 'CACM-0239', 'fake_docid']
+        weights, vocabulary = self.index_reader.get_bm25_document_vectors(docids)
+        self.assertEqual(weights.shape, (3, 14363))
+        self.assertAlmostEqual(weights[0, vocabulary['inform']], 2.06514, places=5)
+        self.assertAlmostEqual(weights[0, vocabulary['retriev']], 2.70038, places=5)
+        self.assertEqual(weights[2].nnz, 0)
+
+        # Should agree with compute_bm25_term_weight for every term of every document.
+        for i, docid in enumerate(docids[:2]):
+            doc_vector = self.index_reader.get_document_vector(docid)
+            self.assertEqual(weights[i].nnz, len(doc_vector))
+            for term in doc_vector:
+                self.assertAlmostEqual(weights[i, vocabulary[term]],
+                                       self.index_reader.compute_bm25_term_weight(docid, term, analyzer=None),
+                                       places=4)
+
+        grid = self.index_reader.compute_bm25_term_weights(docids, ['information', 'retrieval', 'fox'],
+                                                           k1=1.2, b=0.75)
+        self.assertEqual(grid.shape, (3, 3))
+        self.assertAlmostEqual(grid[0, 0], 1.925014, places=5)
+        self.assertAlmostEqual(grid[0, 1], 2.496352, places=5)
+        self.assertAlmostEqual(grid[0, 2], 0., places=5)
+        self.assertAlmostEqual(grid[1, 1], self.index_reader.compute_bm25_term_weight('CACM-0239', 'retrieval',
+                                                                                      k1=1.2, b=0.75), places=4)
+        self.assertEqual(grid[2].sum(), 0)
+
+        grid = self.index_reader.compute_bm25_term_weights(['CACM-3134'], ['inform', 'retriev'], analyzer=None)
+        self.assertAlmostEqual(grid[0, 0], 2.06514, places=5)
+        self.assertAlmostEqual(grid[0, 1], 2.70038, places=5)
+
     def test_docid_converstion(self):
         self.assertEqual(self.index_reader.convert_internal_docid_to_collection_docid(1), 'CACM-0002')
         self.assertEqual(self.index_reader.convert_collection_docid_to_internal_docid('CACM-0002'), 1)
         self.assertEqual(self.index_reader.convert_internal_docid_to_collection_docid(1000), 'CACM-1001')
         self.assertEqual(self.index_reader.convert_collection_docid_to_internal_docid('CACM-1001'), 1000)
 
+    def test_docid_map(self):
+        docid_map = self.index_reader.get_docid_map()
+        self.assertTrue(os.path.isdir(os.path.join(self.index_reader.export_dir, 'docids')))
+        self.assertEqual(len(docid_map), 3204)
+        self.assertEqual(docid_map.convert_internal_docid_to_collection_docid(1), 'CACM-0002')
+        self.assertEqual(docid_map.convert_collection_docid_to_internal_docid('CACM-0002'), 1)
+        self.assertEqual(docid_map.convert_internal_docid_to_collection_docid(1000), 'CACM-1001')
+        self.assertEqual(docid_map.convert_collection_docid_to_internal_docid('CACM-1001'), 1000)
+        self.assertEqual(docid_map.convert_collection_docid_to_internal_docid('fake_docid'), -1)
+
+        self.assertEqual(list(docid_map.convert_internal_docids_to_collection_docids([1, 1000])),
+                         ['CACM-0002', 'CACM-1001'])
+        internal_docids = docid_map.convert_collection_docids_to_internal_docids(['CACM-1001', 'fake', 'CACM-0002'])
+        self.assertEqual(list(internal_docids), [1000, -1, 1])
+
+        # Loading from the cache gives the same mapping as the index.
+        for docid in [0, 238, 3168, 3203]:
+            self.assertEqual(self.index_reader.get_docid_map().convert_internal_docid_to_collection_docid(docid),
+                             self.index_reader.convert_internal_docid_to_collection_docid(docid))
+
+    def test_term_statistics(self):
+        term_stats = self.index_reader.get_term_statistics()
+        self.assertTrue(os.path.isdir(os.path.join(self.index_reader.export_dir, 'termstats')))
+        self.assertEqual(len(term_stats), 14363)
+        self.assertEqual(term_stats.stats(), self.index_reader.stats())
+
+        # Terms are pre-analyzed, so they match get_term_counts without further analysis.
+        for term in ['retriev', 'inform', 'on', '0', 'zoölogy', 'fakeword']:
+            self.assertEqual(term_stats.get_term_counts(term), self.index_reader.get_term_counts(term, analyzer=None))
+        self.assertEqual(term_stats.get_term_counts('retriev'), (138, 275))
+
+        df, cf = term_stats.batch_get_term_counts(['retriev', 'fakeword', 'inform'])
+        self.assertEqual(list(df), [138, 0, term_stats.get_term_counts('inform')[0]])
+        self.assertEqual(list(cf), [275, 0, term_stats.get_term_counts('inform')[1]])
+
+        # Loading without the JVM gives the same statistics.
+        self.assertEqual(export.TermStatistics(term_stats.path).get_term_counts('retriev'), (138, 275))
+
     def test_jstring_term(self):
         self.assertEqual(self.index_reader.get_term_counts('zoölogy'), (0, 0))
         with self.assertRaises(ValueError):
@@ -330,6 +673,149 @@ class TestIndexUtils(unittest.TestCase):
                                        self.index_reader.compute_query_document_score(
                                            hits[i].docid, query, similarity=custom_qld), places=4)
 
+    def _add_document(self, docid, contents, replace=False):
+        # Add (or replace) a document with a plain Lucene IndexWriter, and commit.
+        JDocument = autoclass('org.apache.lucene.document.Document')
+        JFieldStore = autoclass('org.apache.lucene.document.Field$Store')
+        JIndexWriter = autoclass('org.apache.lucene.index.IndexWriter')
+        JIndexWriterConfig = autoclass('org.apache.lucene.index.IndexWriterConfig')
+        JStringField = autoclass('org.apache.lucene.document.StringField')
+        JTerm = autoclass('org.apache.lucene.index.Term')
+        JTextField = autoclass('org.apache.lucene.document.TextField')
+        writer = JIndexWriter(autoclass('org.apache.lucene.store.FSDirectory').open(JPaths.get(self.index_path)),
+                              JIndexWriterConfig(analysis.get_lucene_analyzer()))
+        document = JDocument()
+        document.add(JStringField(JString('id'), JString(docid), JFieldStore.YES))
+        document.add(JTextField(JString('contents'), JString(contents), JFieldStore.NO))
+        if replace:
+            writer.updateDocument(JTerm(JString('id'), JString(docid)), document)
+        else:
+            writer.addDocument(document)
+        writer.commit()
+        writer.close()
+
+    def test_stale_exports(self):
+        docid_map = self.index_reader.get_docid_map()
+        term_stats = self.index_reader.get_term_statistics()
+        self.assertEqual(docid_map.convert_collection_docid_to_internal_docid('CACM-0002'), 1)
+        self.assertIn('index_generation', docid_map.metadata)
+        self.assertIn('index_version', docid_map.metadata)
+
+        # Replacing a document deletes it and adds it again under a new internal docid.
+        self._add_document('CACM-0002', 'zoology of information retrieval', replace=True)
+        self.assertTrue(self.index_reader.refresh())
+
+        # Exports made from the previous commit are redone.
+        docid_map = self.index_reader.get_docid_map()
+        self.assertEqual(len(docid_map), 3205)
+        self.assertIsNone(docid_map.convert_internal_docid_to_collection_docid(1))
+        self.assertEqual(docid_map.convert_collection_docid_to_internal_docid('CACM-0002'), 3204)
+        self.assertEqual(docid_map.convert_collection_docid_to_internal_docid(''), -1)
+        self.assertEqual(list(docid_map.convert_internal_docids_to_collection_docids([0, 1])), ['CACM-0001', None])
+        self.assertEqual(self.index_reader.get_term_statistics().stats(), self.index_reader.stats())
+        self.assertNotEqual(self.index_reader.get_term_statistics().stats(), term_stats.stats())
+
+    def test_deleted_documents(self):
+        # Replacing a document deletes it, but its segment still serves its term vector until it is merged away.
+        doc_vector = self.index_reader.get_document_vector('CACM-0002')
+        total_terms = self.index_reader.stats()['total_terms']
+        self._add_document('CACM-0002', 'zoology of information retrieval', replace=True)
+        self.assertTrue(self.index_reader.refresh())
+
+        matrix = self.index_reader.get_document_term_matrix().matrix
+        self.assertEqual(matrix.shape[0], 3205)
+        self.assertEqual(matrix[1].nnz, 0)
+        self.assertEqual(matrix[0].nnz, len(self.index_reader.get_document_vector('CACM-0001')))
+        # The new version is indexed without a term vector, so only the deleted version's terms are gone.
+        self.assertEqual(matrix.sum(), total_terms - sum(doc_vector.values()))
+
+        doc_lengths = self.index_reader.get_document_lengths()
+        self.assertEqual(len(doc_lengths), 3205)
+        self.assertEqual((doc_lengths.lengths[1], doc_lengths.unique_terms[1], doc_lengths.norm_lengths[1]), (0, 0, 0))
+        self.assertEqual(doc_lengths.lengths.sum(), matrix.sum())
+        self.assertGreater(doc_lengths.norm_lengths[3204], 0)
+
+        # The impact index has no postings for the deleted version, so searching for its terms never returns it, nor
+        # a docid that no longer maps to a document.
+        impact_searcher = export.ImpactSearcher(self.index_reader.get_impact_index().path)
+        hits = impact_searcher.search(list(doc_vector.keys()), k=3205)
+        self.assertGreater(len(hits), 0)
+        self.assertNotIn(None, [hit.docid for hit in hits])
+        self.assertNotIn('CACM-0002', [hit.docid for hit in hits])
+
+    def test_refresh(self):
+        self.assertFalse(self.index_reader.refresh())
+        self.assertFalse(self.searcher.refresh())
+        self.searcher.set_bm25(0.8, 0.2)
+        hits = self.searcher.search('information retrieval')
+
+        # Append a document to the index with a plain Lucene IndexWriter.
+        self._add_document('CACM-9999', 'zoology of information retrieval')
+
+        self.assertTrue(self.index_reader.refresh())
+        self.assertFalse(self.index_reader.refresh())
+        self.assertEqual(self.index_reader.stats()['documents'], 3205)
+        self.assertEqual(self.index_reader.get_term_counts('zoology'), (1, 1))
+        self.assertEqual(len(self.index_reader.get_vocabulary()), self.index_reader.stats()['unique_terms'])
+
+        self.assertTrue(self.searcher.refresh())
+        self.assertEqual(self.searcher.num_docs, 3205)
+        self.assertEqual(self.searcher.search('zoology')[0].docid, 'CACM-9999')
+        # The scoring function is kept across refreshes.
+        self.assertEqual(self.searcher.get_similarity().toString(), 'BM25(k1=0.8,b=0.2)')
+        self.assertEqual(len(self.searcher.search('information retrieval')), len(hits))
+
+        self.searcher.start_auto_refresh(interval=0.1)
+        self.index_reader.start_auto_refresh(interval=0.1)
+        self.searcher.stop_auto_refresh()
+        self.index_reader.stop_auto_refresh()
+
+    def test_refresh_in_flight(self):
+        # A call that started before a refresh keeps its reader (and searcher) open until it returns.
+        with self.index_reader._acquire_reader() as reader, self.searcher._acquire() as searcher:
+            self._add_document('CACM-9999', 'zoology of information retrieval')
+            self.assertTrue(self.index_reader.refresh())
+            self.assertTrue(self.searcher.refresh())
+            self.assertEqual(reader.document(0).get('id'), 'CACM-0001')
+            self.assertEqual(len(searcher.search(JString('information retrieval'), 10)), 10)
+        self.assertEqual(reader.getRefCount(), 0)
+        self.assertEqual(self.index_reader.stats()['documents'], 3205)
+        self.assertEqual(self.searcher.num_docs, 3205)
+
+        self.index_reader.close()
+        with self.assertRaises(ValueError):
+            self.index_reader.stats()
+
+    def test_refresh_concurrent(self):
+        # Refresh in a loop while documents are added, each with one new term, so that every commit has as many new
+        # terms as new documents: exports that mixed up readers would not line up.
+        path = os.path.join(self.index_dir, 'docterms')
+        docids = ['CACM-3134', 'CACM-0002', 'CACM-0239']
+        stop = threading.Event()
+
+        def refresh_loop():
+            while not stop.wait(0.01):
+                self.index_reader.refresh()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            refresher = executor.submit(refresh_loop)
+            try:
+                for i in range(5):
+                    self._add_document(f'CACM-{9000 + i}', f'information retrieval zoology{"abcde"[i]}')
+                    doc_term_matrix = self.index_reader.get_document_term_matrix(path=path, rebuild=True)
+                    num_docs, num_terms = doc_term_matrix.matrix.shape
+                    self.assertEqual(num_terms, len(doc_term_matrix.terms))
+                    self.assertEqual(num_docs - 3204, num_terms - 14363)
+
+                    weights, vocabulary = self.index_reader.get_bm25_document_vectors(docids)
+                    self.assertEqual(weights.shape, (3, len(vocabulary)))
+                    self.assertTrue((weights.data > 0).all())
+                    self.assertGreater(weights[0, vocabulary['inform']], 0)
+            finally:
+                stop.set()
+            refresher.result()
+        self.assertEqual(self.index_reader.stats()['documents'], 3209)
+
     def test_index_stats(self):
         self.assertEqual(3204, self.index_reader.stats()['documents'])
         self.assertEqual(14363, self.index_reader.stats()['unique_terms'])
@@ -0,0 +1,139 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tarfile
+import unittest
+from random import randint
+from urllib.request import urlretrieve
+
+import numpy as np
+
+from pyserini.analysis import get_lucene_analyzer
+from pyserini.fusion import FusionMethod, average, interpolation, reciprocal_rank_fusion
+from pyserini.pipeline import FuseStage, Pipeline, RetrieveStage, WriteStage
+from pyserini.pyclass import autoclass, JPaths, JString
+from pyserini.search import SimpleSearcher
+from pyserini.trectools import TrecRun
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        # Download pre-built CACM index; append a random value to avoid filename clashes.
+        r = randint(0, 10000000)
+        self.collection_url = 'https://github.com/castorini/anserini-data/raw/master/CACM/lucene-index.cacm.tar.gz'
+        self.tarball_name = 'lucene-index.cacm-{}.tar.gz'.format(r)
+        self.index_dir = 'index{}/'.format(r)
+        self.cache_dir = 'cache{}/'.format(r)
+        self.output_path = 'output_test_pipeline{}.txt'.format(r)
+
+        _, _ = urlretrieve(self.collection_url, self.tarball_name)
+
+        tarball = tarfile.open(self.tarball_name)
+        tarball.extractall(self.index_dir)
+        tarball.close()
+
+        self.index_path = os.path.join(self.index_dir, 'lucene-index.cacm')
+        self.queries = {1: 'information retrieval', 2: 'search', 3: 'databases'}
+
+    def test_retrieve_and_write(self):
+        retrieve = RetrieveStage(self.index_path, k=100)
+        stats = Pipeline([WriteStage(retrieve, self.output_path)], cache_dir=self.cache_dir).run(self.queries)
+        self.assertEqual(stats['retrieve'].computed, 3)
+        self.assertEqual(stats['retrieve'].cached, 0)
+
+        searcher = SimpleSearcher(self.index_path)
+        run = TrecRun(self.output_path)
+        for topic, query in self.queries.items():
+            hits = searcher.search(query, 100)
+            docs = run.get_docs_by_topic(topic)
+            self.assertEqual(list(docs['docid']), [hit.docid for hit in hits])
+        searcher.close()
+
+        # Same retrieval configuration: everything is served from cache.
+        retrieve = RetrieveStage(self.index_path, k=100)
+        stats = Pipeline([WriteStage(retrieve, self.output_path)], cache_dir=self.cache_dir).run(self.queries)
+        self.assertEqual(stats['retrieve'].computed, 0)
+        self.assertEqual(stats['retrieve'].cached, 3)
+
+        # A different configuration is not.
+        retrieve = RetrieveStage(self.index_path, k=100, bm25=(1.2, 0.75))
+        stats = Pipeline([WriteStage(retrieve, self.output_path)], cache_dir=self.cache_dir).run(self.queries)
+        self.assertEqual(stats['retrieve'].computed, 3)
+
+        # Neither is the same configuration once the index has changed.
+        JDocument = autoclass('org.apache.lucene.document.Document')
+        JIndexWriter = autoclass('org.apache.lucene.index.IndexWriter')
+        JIndexWriterConfig = autoclass('org.apache.lucene.index.IndexWriterConfig')
+        JField = autoclass('org.apache.lucene.document.Field$Store')
+        JStringField = autoclass('org.apache.lucene.document.StringField')
+        writer = JIndexWriter(autoclass('org.apache.lucene.store.FSDirectory').open(JPaths.get(self.index_path)),
+                              JIndexWriterConfig(get_lucene_analyzer()))
+        document = JDocument()
+        document.add(JStringField(JString('id'), JString('CACM-9999'), JField.YES))
+        writer.addDocument(document)
+        writer.commit()
+        writer.close()
+        retrieve = RetrieveStage(self.index_path, k=100)
+        stats = Pipeline([WriteStage(retrieve, self.output_path)], cache_dir=self.cache_dir).run(self.queries)
+        self.assertEqual(stats['retrieve'].computed, 3)
+
+    def test_fuse(self):
+        bm25 = RetrieveStage(self.index_path, k=100, name='bm25')
+        qld = RetrieveStage(self.index_path, k=100, qld=1000, name='qld')
+        fuse = FuseStage([bm25, qld], method=FusionMethod.RRF, k=50)
+        Pipeline([WriteStage(fuse, self.output_path)], cache_dir=self.cache_dir).run(self.queries)
+        run = TrecRun(self.output_path)
+        self.assertEqual(run.topics(), {1, 2, 3})
+        self.assertEqual(len(run.get_docs_by_topic(1)), 50)
+
+        # Changing only the fusion parameters does not re-run retrieval.
+        fuse = FuseStage([bm25, qld], method=FusionMethod.RRF, rrf_k=10, k=50)
+        stats = Pipeline([WriteStage(fuse, self.output_path)], cache_dir=self.cache_dir).run(self.queries)
+        self.assertEqual(stats['bm25'].cached, 3)
+        self.assertEqual(stats['qld'].cached, 3)
+        self.assertEqual(stats['fuse'].computed, 3)
+
+    def test_fuse_single_input(self):
+        # A topic with results from a single input is rescored as fusing whole runs would, where the other run lacks
+        # the topic.
+        doc_ids, scores = np.array(['d3', 'd1', 'd2', 'd4']), np.array([3., 2., 2., 1.])
+        empty = np.array([], dtype=str), np.array([], dtype=np.float64)
+        run = TrecRun.from_search_results(list(zip(doc_ids, scores)), topic=1)
+        other_run = TrecRun.from_search_results([('d5', 5.)], topic=2)
+
+        for method, fuse in [(FusionMethod.RRF, lambda runs: reciprocal_rank_fusion(runs, rrf_k=10, depth=3, k=2)),
+                             (FusionMethod.INTERPOLATION, lambda runs: interpolation(runs, alpha=0.3, depth=3, k=2)),
+                             (FusionMethod.AVERAGE, lambda runs: average(runs, depth=3, k=2))]:
+            stage = FuseStage([], method=method, rrf_k=10, alpha=0.3, depth=3, k=2)
+            for inputs, runs in [([(doc_ids, scores), empty], [run, other_run]),
+                                 ([empty, (doc_ids, scores)], [other_run, run])]:
+                fused_doc_ids, fused_scores = stage.process(1, '', inputs)
+                expected = fuse(runs).get_docs_by_topic(1)
+                self.assertEqual(list(fused_doc_ids), list(expected['docid']))
+                np.testing.assert_allclose(fused_scores, expected['score'].astype(np.float64))
+
+    def tearDown(self):
+        os.remove(self.tarball_name)
+        shutil.rmtree(self.index_dir)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
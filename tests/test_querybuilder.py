@@ -130,6 +130,84 @@ class TestQueryBuilding(unittest.TestCase):
             self.assertEqual(h1.docid, h2.docid)
             self.assertEqual(h1.score, h2.score)
 
+    def testWeightedQuery(self):
+        should = querybuilder.JBooleanClauseOccur['should'].value
+        boolean_query = querybuilder.get_boolean_query_builder()
+        boolean_query.add(querybuilder.get_boost_query(querybuilder.get_term_query('information'), 2.), should)
+        boolean_query.add(querybuilder.get_boost_query(querybuilder.get_term_query('retrieval'), 3.), should)
+        hits1 = self.searcher.search(boolean_query.build())
+
+        hits2 = self.searcher.search(querybuilder.get_weighted_query({'information': 2., 'retrieval': 3.}))
+        hits3 = self.searcher.search(querybuilder.get_weighted_query([('information', 2.), ('retrieval', 3., 'contents')]))
+
+        self.assertEqual(len(hits1), len(hits2))
+        for h1, h2, h3 in zip(hits1, hits2, hits3):
+            self.assertEqual(h1.docid, h2.docid)
+            self.assertAlmostEqual(h1.score, h2.score, places=5)
+            self.assertEqual(h1.docid, h3.docid)
+            self.assertAlmostEqual(h1.score, h3.score, places=5)
+
+    def testWeightedQueryUnitWeights(self):
+        # With unit weights and stopwords dropped, we get plain bag-of-words results.
+        query = querybuilder.get_weighted_query({'information': 1., 'retrieval': 1., 'the': 1.})
+        hits1 = self.searcher.search(query)
+        hits2 = self.searcher.search('information retrieval')
+
+        for h1, h2 in zip(hits1, hits2):
+            self.assertEqual(h1.docid, h2.docid)
+            self.assertAlmostEqual(h1.score, h2.score, places=5)
+
+        with self.assertRaises(ValueError):
+            querybuilder.get_weighted_query({'information': -1.})
+
+    def testWeightedQueryParsers(self):
+        # Parsers are cached per (field, analyzer), for a bounded number of pairs.
+        for i in range(2 * querybuilder._max_query_parsers):
+            querybuilder.get_weighted_query({'information': 1.}, field=f'field{i}')
+        self.assertEqual(len(querybuilder._query_parsers.cache), querybuilder._max_query_parsers)
+
+    def testQueryCache(self):
+        cache = querybuilder.QueryCache()
+        query1 = cache.get_query('information retrieval')
+        query2 = cache.get_query('information retrieval')
+        self.assertTrue(query1 is query2)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+        hits1 = self.searcher.search(query1)
+        hits2 = self.searcher.search('information retrieval')
+        for h1, h2 in zip(hits1, hits2):
+            self.assertEqual(h1.docid, h2.docid)
+            self.assertAlmostEqual(h1.score, h2.score, places=5)
+
+        # A different analyzer yields a different query.
+        query3 = cache.get_query('information retrieval', analyzer=get_lucene_analyzer(stemming=False))
+        self.assertFalse(query1 is query3)
+        self.assertEqual(cache.misses, 2)
+
+        # Generators are keyed by instance, so a new one yields a different query.
+        query_generator = search.JBagOfWordsQueryGenerator()
+        query4 = cache.get_query('information retrieval', query_generator)
+        self.assertFalse(query1 is query4)
+        self.assertTrue(cache.get_query('information retrieval', query_generator) is query4)
+        self.assertEqual(cache.misses, 3)
+
+        # Entries, along with the generators and analyzers they hold on to, are evicted beyond max_size.
+        cache = querybuilder.QueryCache(max_size=2)
+        for q in ['information', 'retrieval', 'information retrieval']:
+            cache.get_query(q, search.JBagOfWordsQueryGenerator())
+        self.assertEqual(len(cache.queries), 2)
+        self.assertEqual(list(key[0] for key in cache.queries), ['retrieval', 'information retrieval'])
+
+    def testQueryTemplate(self):
+        template = querybuilder.QueryTemplate('retrieval')
+        hits = self.searcher.search(template.combine('information'), k=100)
+        self.assertTrue(len(hits) > 0)
+
+        # Every hit must contain the fixed term.
+        fixed_hits = self.searcher.search('retrieval', k=1000)
+        self.assertTrue(set(hit.docid for hit in hits) <= set(hit.docid for hit in fixed_hits))
+
     def tearDown(self):
         self.searcher.close()
         os.remove(self.tarball_name)
@@ -0,0 +1,72 @@
+#
+# Pyserini: Python interface to the Anserini IR toolkit built on Lucene
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import unittest
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from pyserini.search.reranker import ClassifierType, PseudoRelevanceClassifierReranker
+
+
+class TestReranker(unittest.TestCase):
+    def setUp(self):
+        # The score manipulation helpers don't touch the index, so skip building the vectorizer.
+        self.ranker = PseudoRelevanceClassifierReranker.__new__(PseudoRelevanceClassifierReranker)
+
+    def test_normalize(self):
+        scores = self.ranker._normalize(np.array([2., 4., 3.]))
+        np.testing.assert_allclose(scores, [0., 1., 0.5])
+
+        # zero-width range should not divide by zero
+        scores = self.ranker._normalize(np.array([3., 3., 3.]))
+        np.testing.assert_allclose(scores, [1., 1., 1.])
+
+    def test_sort_dual_list(self):
+        scores, doc_ids = self.ranker._sort_dual_list(np.array([0.5, 0.9, 0.5, 0.1]), ['b', 'a', 'c', 'd'])
+        np.testing.assert_allclose(scores, [0.9, 0.5, 0.5, 0.1])
+        self.assertEqual(list(doc_ids), ['a', 'c', 'b', 'd'])
+
+    def test_classifiers(self):
+        # Synthetic PRF set over 30 candidates: the top 5 share terms 0-2 and the bottom 10 share terms 3-5. Of the
+        # unlabeled candidates in between, the even ones look like the top and the odd ones like the bottom.
+        rng = np.random.RandomState(0)
+        vectors = rng.uniform(0, 0.1, size=(30, 8))
+        vectors[:5, :3] += 1
+        vectors[20:, 3:6] += 1
+        vectors[5:20:2, :3] += 1
+        vectors[6:20:2, 3:6] += 1
+        test_vecs = csr_matrix(vectors)
+        train_idx = list(range(5)) + list(range(20, 30))
+        prf_vectors = test_vecs[train_idx], [1] * 5 + [0] * 10, test_vecs
+
+        doc_ids = [f'doc{i}' for i in range(30)]
+        search_scores = np.zeros(30)
+        self.ranker.alpha = 1
+        for clf_type in [ClassifierType.LR, ClassifierType.SVM, ClassifierType.LINEAR_SVM, ClassifierType.SGD]:
+            self.ranker._set_classifier(clf_type)
+            scores = self.ranker._score_with_classifier(doc_ids, search_scores, prf_vectors)
+            self.assertEqual(scores.shape, (30,), clf_type)
+            self.assertTrue(np.all((scores >= 0) & (scores <= 1)), clf_type)
+            # Every candidate resembling the top ranks above every candidate resembling the bottom.
+            self.assertGreater(scores[5:20:2].min(), scores[6:20:2].max(), clf_type)
+
+            probabilities = self.ranker.clf.predict_proba(test_vecs)
+            np.testing.assert_allclose(probabilities.sum(axis=1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()